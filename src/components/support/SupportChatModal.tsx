@@ -49,6 +49,10 @@ export const SupportChatModal: React.FC<SupportChatModalProps> = ({
     }
     }, [open]);
 
+  // follow the streamed reply as it grows, not just new messages
+  const lastMessage = messages[messages.length - 1];
+  const lastContent = lastMessage?.content;
+
   useEffect(() => {
     requestAnimationFrame(() => {
       scrollRef.current?.scrollTo({
@@ -56,7 +60,7 @@ export const SupportChatModal: React.FC<SupportChatModalProps> = ({
         behavior: "smooth",
       });
     });
-  }, [messages.length]);
+  }, [messages.length, lastContent]);
 
   const canSend = useMemo(() => input.trim().length > 0 && !loading, [input, loading]);
 
@@ -109,6 +113,8 @@ export const SupportChatModal: React.FC<SupportChatModalProps> = ({
 
             {messages.map((msg: SupportChatMessage, index) => {
               const isUser = msg.role === "user";
+              // streaming reply placeholder: "Typing…" shows until the first token
+              if (!isUser && !msg.content) return null;
               return (
                 <div
                   key={index}
@@ -128,7 +134,7 @@ export const SupportChatModal: React.FC<SupportChatModalProps> = ({
               );
             })}
 
-            {loading && (
+            {loading && !(lastMessage?.role === "assistant" && lastContent) && (
               <div className="flex justify-start">
                 <div className="max-w-[85%] rounded-2xl px-3 py-2 text-sm bg-background border text-muted-foreground">
                   Typing…
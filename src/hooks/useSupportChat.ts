@@ -70,20 +70,33 @@ export const useSupportChat = () => {
     ]);
     touchActivity();
 
+    // placeholder assistant message that fills in as the reply streams
+    const replyTs = new Date().toISOString();
+    setMessages((prev) => [...prev, { role: "assistant", content: "", ts: replyTs }]);
+
+    const setReply = (update: (content: string) => string) =>
+      setMessages((prev) =>
+        prev.map((m) =>
+          m.role === "assistant" && m.ts === replyTs ? { ...m, content: update(m.content) } : m
+        )
+      );
+
     try {
-      const response = await supportChatClient.sendMessage({
-        username,
-        route: location.pathname,
-        message,
-        conversationId: conversationId ?? undefined,
-      });
-
-      setMessages((prev) => [
-        ...prev,
-        { role: "assistant", content: response.reply, ts: new Date().toISOString() },
-      ]);
+      const response = await supportChatClient.streamMessage(
+        {
+          username,
+          route: location.pathname,
+          message,
+          conversationId: conversationId ?? undefined,
+        },
+        (text) => setReply((content) => content + text)
+      );
+
+      // the final reply may add to what was streamed (e.g. the support email note)
+      setReply(() => response.reply);
       touchActivity();
     } catch {
+      setMessages((prev) => prev.filter((m) => !(m.role === "assistant" && m.ts === replyTs && !m.content)));
       setError("Failed to send message. Please try again.");
     } finally {
       setLoading(false);
@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Optional
+
+from . import creator_stats
+from .scoring import fact_check
+from .tweet_cache import tweet_hash
+
+
+def extract_calls(tweets: List[Dict[str, Any]], calls_per_tweet: List[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+    """One entry per call, newest tweet first, carrying the tweet's timestamp and hash."""
+    return [
+        {**call, "postedAt": tweet.get("postedAt"), "tweetHash": tweet_hash(tweet["text"])}
+        for tweet, tweet_calls in zip(tweets, calls_per_tweet)
+        for call in tweet_calls
+    ]
+
+
+def build_result(
+    twitter_username: str,
+    tweets: List[Dict[str, Any]],
+    calls: List[Dict[str, Any]],
+    scrape_stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Fact-check a handle's calls into the /analyze result shape.
+
+    "reliability" is the creator's running score over every matured call seen
+    so far (creator_stats); "windowReliability" is the score over just these
+    tweets, used as the headline until the creator has matured calls.
+    """
+    tickers = list(dict.fromkeys(c["ticker"] for c in calls))
+    print(f"📊 Extracted {len(calls)} calls on {len(tickers)} tickers")
+
+    if not calls:
+        print("⚠️ No valid ticker calls found in tweets.")
+        return {
+            "success": True,
+            "reliability": 0,
+            "tweetCount": len(tweets),
+            "username": twitter_username,
+            "tickers": "",
+            "breakdown": {},
+            "message": "No ticker calls found.",
+            "scrapeStats": scrape_stats or {},
+        }
+
+    details = {}
+    correct, total, breakdown = fact_check(calls, details=details)
+    window_reliability = round((correct / total) * 100) if total else 0
+    running = creator_stats.fold(twitter_username, calls, details["scored"])
+
+    return {
+        "success": True,
+        "reliability": running["reliability"] if running["total"] else window_reliability,
+        "windowReliability": window_reliability,
+        "running": running,
+        "tweetCount": len(tweets),
+        "username": twitter_username,
+        "tickers": ", ".join(tickers),
+        "breakdown": breakdown,
+        "horizons": details["horizons"],
+        "scrapeStats": scrape_stats or {},
+    }
+
+
+def snipe_doc(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The Firestore snipe document for an analysis result."""
+    twitter_username = result["username"]
+    return {
+        "username": twitter_username,
+        "twitterLink": f"https://x.com/{twitter_username}",
+        "tickers": result["tickers"],
+        "reliabilityScore": result["reliability"],
+        "breakdown": result["breakdown"],
+        "horizons": result["horizons"],
+        "windowReliabilityScore": result["windowReliability"],
+        "runningCorrect": result["running"]["correct"],
+        "runningTotal": result["running"]["total"],
+        "runningHorizons": result["running"]["horizons"],
+    }
@@ -1,25 +1,37 @@
-import os, time
+import os, json, time, threading, hashlib, hmac
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from flask import Flask, request, jsonify
-from openai import OpenAI
-import yfinance as yf
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-import numpy as np
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
-import firebase_admin
-from firebase_admin import credentials, firestore, auth as firebase_auth
 from flask_limiter.util import get_remote_address
 from uuid import uuid4
-from .support_chat import support_chat
+from .support_chat import support_chat, support_chat_stream
 from .notifier import send_feature_request_email
-from .memory_store import get_or_create_convo, end_convo
+from .memory_store import get_or_create_convo, end_convo, mark_feature_requested
 from .transcripts import save_transcript
+from .jobs import Job, QueueFullError, analyze_jobs, batch_jobs, get_job
+from .scraper import get_tweets_cached
+from .classifier import analyze_tweets
+from .analysis import extract_calls, build_result, snipe_doc
+from .leaderboard import LEADERBOARD_MAX_HANDLES, normalize_handles, run_leaderboard, summarize
+from .browser_pool import browser_pool
+from .firestore_client import init_firebase, get_db
+from .snipe_writer import snipe_writer
+from .creator_stats import top_creators, breakdown as creator_breakdown
+from .scoring import HORIZONS, PRIMARY_HORIZON
+from .auth_cache import verify_id_token_cached, get_cached_username, cache_username, auth_cache_stats
+from . import metrics
+from .classifier import classifier_stats
+from .llm_gateway import llm_stats
+from .market_data import market_data_stats
+from .memory_store import memory_store_stats
+from .notifier import notifier_stats
+from .response_cache import support_cache_stats
+from .support_chat import support_prompt_stats
+from .transcripts import transcript_writer_stats
 
 app = Flask(__name__)
 limiter = Limiter(get_remote_address, app=app, default_limits=["300 per day", "10 per minute"])
@@ -35,138 +47,163 @@ CORS(
     supports_credentials=True,
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
     methods=["GET", "POST", "OPTIONS"],
+    expose_headers=["Server-Timing"],
 )
 
+# Bearer token required to read /metrics; while unset the endpoint is off (404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+for _component, _stats in {
+    "analyze_jobs": analyze_jobs.stats,
+    "batch_jobs": batch_jobs.stats,
+    "auth_cache": auth_cache_stats,
+    "browser_pool": browser_pool.stats,
+    "classifier": classifier_stats,
+    "llm": llm_stats,
+    "market_data": market_data_stats,
+    "memory_store": memory_store_stats,
+    "notifier": notifier_stats,
+    "snipe_writer": snipe_writer.stats,
+    "support_cache": support_cache_stats,
+    "support_prompt": support_prompt_stats,
+    "transcripts": transcript_writer_stats,
+}.items():
+    metrics.register_collector(_component, _stats)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_timings()
+
+@app.after_request
+def record_request_timing(response):
+    """Request latency histogram plus a Server-Timing header with the stages this request ran."""
+    started = g.pop("request_started", None)
+    timings = metrics.pop_timings()
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    metrics.http_request_seconds.observe(
+        total, endpoint=request.endpoint or "unmatched", method=request.method, status=response.status_code
+    )
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings, total)
+    return response
+
 @app.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
         return ("", 204)
 
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
+init_firebase()
+
+# Start Chrome for every pool slot in the background so the first scrape doesn't pay for it
+if os.getenv("BROWSER_POOL_WARM", "1") != "0":
+    threading.Thread(target=browser_pool.warm, daemon=True).start()
 
 def ratelimit_handler(e):
     return jsonify(success=False, error="Too many requests, slow down."), 429
 
-# Scrape tweets using logged-in Selenium session
-def get_tweets(twitter_username: str, limit: int = 100):
-    options = Options()
-    # keep your persistent profile (optional, helps sometimes, but not required)
-    options.add_argument("--user-data-dir=/Users/akuul15/.snipr_chrome")
-    options.add_argument("--profile-directory=Default")
+def _authenticate():
+    """Verify the Firebase ID token. Returns (decoded_token, None) or (None, error_response)."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None, (jsonify(error="Missing or invalid Authorization header"), 401)
+
+    id_token = auth_header.split("Bearer ")[1]
+    try:
+        with metrics.timed("auth_verify"):
+            decoded_token: dict = verify_id_token_cached(id_token)
+        print("✅ Authenticated Firebase user:", decoded_token.get("email", ""))
+        return decoded_token, None
+    except Exception as e:
+        print("❌ Firebase token verification failed:", e)
+        return None, (jsonify(error="Invalid token"), 401)
 
-    # stability flags
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1400,900")
 
-    driver = webdriver.Chrome(options=options)
-    print("✅ Chrome window launched")
+def _lookup_app_username(db, user_uid: str):
+    """Resolve the app username for a Firebase uid. Returns (username, None) or (None, error_response)."""
+    app_username = get_cached_username(user_uid)
+    if app_username:
+        return app_username, None
 
     try:
-        # go straight to profile (no login)
-        url = f"https://x.com/{twitter_username}"
-        driver.get(url)
-        time.sleep(4)
-        print(f"➡️ Navigating to: {url}")
-
-        # If X shows a login wall, you’ll often still get some tweets.
-        # We scrape what we can. If we get almost nothing, we’ll return [].
-        tweets = []
-        seen = set()
-
-        scroll_attempts = 40
-        stuck_rounds = 0
-        max_stuck_rounds = 4
-        for attempt in range(scroll_attempts):
-            # Grab tweet text blocks
-            elements = driver.find_elements(By.XPATH, '//article//div[@lang]')
-            new_count = 0
-            for el in elements:
-                try:
-                    txt = (el.text or "").strip()
-                    if txt and txt not in seen:
-                        seen.add(txt)
-                        tweets.append(txt)
-                        new_count += 1
-                        if len(tweets) >= limit:
-                            break
-                except Exception:
-                    continue
-            print(f"🔄 Scroll attempt {attempt + 1} | +{new_count} new | total={len(tweets)}")
-            if len(tweets) >= limit:
-                break
-
-            # scroll
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(5.0)
-
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            # if we didn't find new tweets this round, count as "stuck"
-            if new_count == 0:
-                stuck_rounds += 1
-                if stuck_rounds >= max_stuck_rounds:
-                    print("⚠️ No new tweets after multiple scrolls, stopping.")
-                    break
-            else:
-                stuck_rounds = 0
-
-        print(f"✅ Fetched {len(tweets)} tweets (public scrape)")
-        # If X blocked everything, you’ll get ~0-2 tiny strings. Treat that as blocked.
-        if len(tweets) < 3:
-            print("⚠️ Likely blocked by X login wall / rate limits.")
-            return []
-        return tweets[:limit]
+        with metrics.timed("user_lookup"):
+            user_doc = db.collection("users").document(user_uid).get()
+        if not user_doc.exists:
+            print("❌ No user document found for UID:", user_uid)
+            return None, (jsonify(error="User not found"), 404)
 
+        user_data = user_doc.to_dict()
+        if not user_data or "username" not in user_data:
+            print("❌ No 'username' field found in user document")
+            return None, (jsonify(error="Username not found"), 400)
+        app_username = user_data.get("username")
+
+        print("✅ Found app username:", app_username)
+        cache_username(user_uid, app_username)
+        return app_username, None
+    except Exception as e:
+        print("❌ Firestore user lookup failed:", e)
+        return None, (jsonify(error="User lookup failed"), 500)
+
+
+def run_analysis(job: Job, twitter_username: str) -> dict:
+    """
+    Scrape -> classify -> fact-check pipeline. Runs on the analyze worker pool.
+
+    The result's "timings" holds milliseconds per stage (and the sub-stages
+    ran on this thread: browser_acquire, scrape_scroll, price_download, ...).
+    """
+    metrics.start_timings()
+    try:
+        result = _run_analysis(job, twitter_username)
     finally:
-        driver.quit()
+        timings = metrics.pop_timings()
+    stages = {}
+    for stage, seconds in timings:
+        stages[stage] = stages.get(stage, 0.0) + seconds * 1000
+    result["timings"] = {stage: round(ms, 1) for stage, ms in stages.items()}
+    return result
 
 
-# Use OpenAI to analyze tweet sentiments
+def _run_analysis(job: Job, twitter_username: str) -> dict:
+    job.update("scraping", 0.05)
+    scrape_stats = {}
+    try:
+        with metrics.timed("get_tweets"):
+            tweets = get_tweets_cached(twitter_username, limit=30, stats=scrape_stats)
+        print(f"✅ got {len(tweets)} tweets")
+    except Exception as e:
+        print("❌ get_tweets crashed:", repr(e))
+        raise RuntimeError(f"Tweet scraping failed: {e}") from e
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    job.update("classifying", 0.6)
+    try:
+        with metrics.timed("analyze_tweets"):
+            calls_per_tweet = analyze_tweets([t["text"] for t in tweets])
+        print("✅ OpenAI response received")
+    except Exception as e:
+        print("❌ analyze_tweets crashed:", repr(e))
+        raise RuntimeError(f"AI analysis failed: {e}") from e
 
-def analyze_tweets(tweets):
-    prompt = f"""
-Analyze the following tweets for stock-related calls.
-For each ticker mentioned, label it as 'bullish' or 'bearish' based on what the user said.
-Format exactly one per line like:
-AAPL: bullish
-TSLA: bearish
+    calls = extract_calls(tweets, calls_per_tweet)
+    if calls:
+        job.update("fact_checking", 0.8)
+    with metrics.timed("fact_check"):
+        return build_result(twitter_username, tweets, calls, scrape_stats)
 
-Tweets:
-{tweets}
-""".strip()
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a financial analysis assistant."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.3,
-        max_tokens=500,
-    )
-    return (resp.choices[0].message.content or "").strip()
-
-
-# Compare predictions with stock performance
-def fact_check(ticker_calls):
-    correct = 0
-    breakdown = {}
-    for ticker, sentiment in ticker_calls.items():
-        data = yf.Ticker(ticker).history(period="1wk")
-        if data.empty:
-            breakdown[ticker] = None
-            continue
-        start = data.iloc[0]["Close"]
-        end = data.iloc[-1]["Close"]
-        is_correct = (sentiment == "bullish" and end > start) or (sentiment == "bearish" and end < start)
-        breakdown[ticker] = is_correct
-        if is_correct:
-            correct += 1
-    return correct, len(ticker_calls), breakdown
+def _save_snipe_when_done(app_username: str):
+    """Per-requester callback: queue the shared job result for that user's snipe collection."""
+    def _save(job: Job):
+        result = job.result
+        if job.status != "done" or not result or result.get("message"):
+            return
+        # Save under collection named by app username, document by Twitter username
+        snipe_writer.enqueue(f"{app_username}snipe", f"@{result['username']}", snipe_doc(result))
+    return _save
+
 
 @app.route("/analyze", methods=["POST", "OPTIONS"])
 @limiter.limit("10 per minute") 
@@ -174,19 +211,10 @@ def analyze():
     if request.method == "OPTIONS":
         return ("", 204)
     # 🔒 Authenticate user using Firebase ID token
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify(error="Missing or invalid Authorization header"), 401
-
-    id_token = auth_header.split("Bearer ")[1]
-    try:
-        decoded_token: dict = firebase_auth.verify_id_token(id_token)
-        user_uid = decoded_token.get("uid", "")
-        user_email = decoded_token.get("email", "")
-        print("✅ Authenticated Firebase user:", user_email)
-    except Exception as e:
-        print("❌ Firebase token verification failed:", e)
-        return jsonify(error="Invalid token"), 401
+    decoded_token, error = _authenticate()
+    if error:
+        return error
+    user_uid = decoded_token.get("uid", "")
 
     # 📩 Get Twitter URL from request body
     if not request.is_json or request.json is None:
@@ -196,96 +224,143 @@ def analyze():
         return jsonify(error="Missing 'twitterUrl' in request"), 400
     twitter_username = twitter_url.rstrip("/").split("/")[-1]
 
-    # 🐦 Get tweets & analyze
-    try:
-        tweets = get_tweets(twitter_username, limit=30)
-        print(f"✅ got {len(tweets)} tweets")
-    except Exception as e:
-        print("❌ get_tweets crashed:", repr(e))
-        return jsonify(success=False, error="Tweet scraping failed", details=str(e)), 500
+    db = get_db()
+    app_username, error = _lookup_app_username(db, user_uid)
+    if error:
+        return error
 
+    # 🧵 Queue the pipeline; concurrent requests for the same handle share one run
     try:
-        analysis = analyze_tweets(tweets)
-        print("✅ OpenAI response received")
-    except Exception as e:
-        print("❌ analyze_tweets crashed:", repr(e))
-        return jsonify(success=False, error="AI analysis failed", details=str(e)), 500
-
-
-    ticker_calls = {}
-    print("📊 OpenAI Analysis Response:\n", analysis)
-    for line in analysis.split("\n"):
-        if ":" in line:
-            ticker, sentiment = line.split(":")
-            ticker = ticker.strip().replace("$", "").upper()
-            sentiment = sentiment.strip().lower()
-            ticker_calls[ticker] = sentiment
-
-    correct, total, breakdown = fact_check(ticker_calls)
-    reliability = round((correct / total) * 100) if total else 0
-
-    if request.method == "OPTIONS":
-        return '', 204
+        job = analyze_jobs.submit(
+            twitter_username.lower(),
+            run_analysis,
+            twitter_username,
+            on_done=_save_snipe_when_done(app_username),
+        )
+    except QueueFullError as e:
+        return jsonify(success=False, error=str(e)), 503
 
-    if not ticker_calls:
-        print("⚠️ No valid ticker calls found in tweets.")
-        return jsonify(
+    return jsonify(
         success=True,
-        reliability=0,
-        tweetCount=len(tweets),
-        username=twitter_username,
-        breakdown={},
-        message="No ticker calls found."
-    )
+        jobId=job.id,
+        status=job.status,
+        statusUrl=f"/analyze/jobs/{job.id}",
+    ), 202
+
+
+def run_batch_analysis(job: Job, handles: list, collection: str) -> dict:
+    """Leaderboard pipeline for many handles; results land in the requester's snipe collection."""
+    job.update("analyzing", 0.0)
+    run = run_leaderboard(handles, collection=collection, on_progress=lambda done, total: job.update("analyzing", done / total))
+    return {
+        "success": True,
+        "leaderboard": summarize(run),
+        "failed": run["failed"],
+        "stats": run["stats"],
+    }
+
+
+@app.route("/analyze/batch", methods=["POST", "OPTIONS"])
+@limiter.limit("2 per minute")
+def analyze_batch():
+    if request.method == "OPTIONS":
+        return ("", 204)
+    decoded_token, error = _authenticate()
+    if error:
+        return error
+    user_uid = decoded_token.get("uid", "")
 
+    if not request.is_json or request.json is None:
+        return jsonify(error="Invalid or missing JSON in request"), 400
+    handles = normalize_handles(request.json.get("handles") or request.json.get("twitterUrls") or [])
+    if not handles:
+        return jsonify(error="Missing 'handles' in request"), 400
+    if len(handles) > LEADERBOARD_MAX_HANDLES:
+        return jsonify(error=f"At most {LEADERBOARD_MAX_HANDLES} handles per batch"), 400
+
+    db = get_db()
+    app_username, error = _lookup_app_username(db, user_uid)
+    if error:
+        return error
+
+    # the job writes into the requester's collection, so only the same requester may share it
+    collection = f"{app_username}snipe"
+    key = "batch:" + hashlib.sha1(
+        (collection + "|" + ",".join(sorted(h.lower() for h in handles))).encode()
+    ).hexdigest()[:16]
+    try:
+        job = batch_jobs.submit(key, run_batch_analysis, handles, collection)
+    except QueueFullError as e:
+        return jsonify(success=False, error=str(e)), 503
 
-    # 🛡️ Initialize Firebase
-    if not firebase_admin._apps:
-        cred = credentials.Certificate("serviceAccountKey.json")
-        firebase_admin.initialize_app(cred)
+    return jsonify(
+        success=True,
+        jobId=job.id,
+        status=job.status,
+        handles=len(handles),
+        statusUrl=f"/analyze/jobs/{job.id}",
+    ), 202
 
-    db = firestore.client()
 
+@app.route("/leaderboard", methods=["GET", "OPTIONS"])
+def leaderboard():
+    """Creators ranked by running reliability; ?username=foo returns that creator's per-ticker/month breakdown."""
+    if request.method == "OPTIONS":
+        return ("", 204)
+    _, error = _authenticate()
+    if error:
+        return error
+
+    horizon = request.args.get("horizon", PRIMARY_HORIZON)
+    if horizon not in HORIZONS:
+        return jsonify(error=f"Unknown horizon; use one of {', '.join(HORIZONS)}"), 400
+    username = request.args.get("username")
+    if username:
+        return jsonify(success=True, username=username, horizon=horizon, breakdown=creator_breakdown(username, horizon))
     try:
-        user_doc = db.collection("users").document(user_uid).get()
-        if not user_doc.exists:
-            print("❌ No user document found for UID:", user_uid)
-            return jsonify(error="User not found"), 404
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+    except ValueError:
+        return jsonify(error="'limit' must be an integer"), 400
+    return jsonify(success=True, horizon=horizon, leaderboard=top_creators(horizon, limit=limit))
 
-        user_data = user_doc.to_dict()
-        if not user_data or "username" not in user_data:
-            print("❌ No 'username' field found in user document")
-            return jsonify(error="Username not found"), 400
-        app_username = user_data.get("username")
 
-        print("✅ Found app username:", app_username)
-    except Exception as e:
-        print("❌ Firestore user lookup failed:", e)
-        return jsonify(error="User lookup failed"), 500
+@app.route("/analyze/jobs/<job_id>", methods=["GET", "OPTIONS"])
+@limiter.exempt
+def analyze_job_status(job_id):
+    if request.method == "OPTIONS":
+        return ("", 204)
+    _, error = _authenticate()
+    if error:
+        return error
 
-    for k in breakdown:
-        if isinstance(breakdown[k], np.bool_):
-            breakdown[k] = bool(breakdown[k])
+    job = get_job(job_id)
+    if not job:
+        return jsonify(success=False, error="Job not found"), 404
+    return jsonify(success=True, **job.to_dict())
 
-    try:
-        # Save under collection named by user email, document by Twitter username
-        db.collection(f"{app_username}snipe").document(f"@{twitter_username}").set({
-            "username": twitter_username,
-            "twitterLink": f"https://x.com/{twitter_username}",
-            "tickers": ", ".join(ticker_calls.keys()),
-            "reliabilityScore": reliability,
-            "breakdown": breakdown
-        })
-        print("✅ Firestore write successful")
-    except Exception as e:
-        print("❌ Firestore write failed:", e)
 
-    return jsonify(
-        success=True,
-        reliability=reliability,
-        tweetCount=len(tweets),
-        breakdown=breakdown
-    )
+def _handle_missing_feature(response, convo, username, route, message, conversation_id):
+    if response.get("missing_feature"):
+        mark_feature_requested(conversation_id)
+        send_feature_request_email(
+            username=username,
+            route=route,
+            user_message=message,
+            title=response["feature_request"].get("title"),
+            description=response["feature_request"].get("description"),
+            timestamp=convo.last_updated_at,
+            conversation_id=conversation_id
+        )
+
+@app.route("/metrics", methods=["GET"])
+@limiter.exempt
+def metrics_endpoint():
+    """Prometheus text exposition: stage/request histograms, counters and component stats as gauges."""
+    if not METRICS_TOKEN:
+        return jsonify(error="Not found"), 404
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return jsonify(error="Unauthorized"), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/api/support/chat", methods=["POST"])
@@ -303,16 +378,7 @@ def support_chat_endpoint():
     response = support_chat(username, route, message, conversation_id)
 
     # Handle missing feature
-    if response.get("missing_feature"):
-        send_feature_request_email(
-            username=username,
-            route=route,
-            user_message=message,
-            title=response["feature_request"].get("title"),
-            description=response["feature_request"].get("description"),
-            timestamp=convo["lastUpdatedAt"],
-            conversation_id=conversation_id
-        )
+    _handle_missing_feature(response, convo, username, route, message, conversation_id)
 
     return jsonify({
         "reply": response.get("reply"),
@@ -320,6 +386,43 @@ def support_chat_endpoint():
         "missing_feature": response.get("missing_feature", False)
     })
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/api/support/chat/stream", methods=["POST"])
+def support_chat_stream_endpoint():
+    """
+    Same as /api/support/chat but answers as server-sent events:
+    `delta` events with reply text as it is generated, then one `done` event
+    with the final reply, conversationId, missing_feature and ttftMs.
+    """
+    data = request.get_json()
+    username = data.get("username")
+    route = data.get("route")
+    message = data.get("message")
+    conversation_id = data.get("conversationId") or str(uuid4())
+
+    convo = get_or_create_convo(conversation_id, username)
+
+    def generate():
+        for event, payload in support_chat_stream(username, route, message, conversation_id):
+            if event == "delta":
+                yield _sse("delta", {"text": payload})
+                continue
+            _handle_missing_feature(payload, convo, username, route, message, conversation_id)
+            yield _sse("done", {
+                "reply": payload.get("reply"),
+                "conversationId": conversation_id,
+                "missing_feature": payload.get("missing_feature", False),
+                "ttftMs": payload.get("ttftMs"),
+            })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.route("/api/support/chat/end", methods=["POST"])
 def end_chat_endpoint():
     data = request.get_json()
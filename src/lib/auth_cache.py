@@ -0,0 +1,49 @@
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+from firebase_admin import auth as firebase_auth
+
+from .lru_cache import LRUCache
+
+# Verified ID tokens are reused for at most this long, and never past their own exp
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_MAX = int(os.getenv("TOKEN_CACHE_MAX", "10000"))
+# uid -> app username; usernames rarely change, and invalidate_user() drops one on demand
+USERNAME_CACHE_TTL_SECONDS = int(os.getenv("USERNAME_CACHE_TTL_SECONDS", "600"))
+USERNAME_CACHE_MAX = int(os.getenv("USERNAME_CACHE_MAX", "5000"))
+
+
+_tokens = LRUCache(TOKEN_CACHE_MAX)
+_usernames = LRUCache(USERNAME_CACHE_MAX)
+
+
+def verify_id_token_cached(id_token: str) -> dict:
+    """firebase_auth.verify_id_token, memoized per token until min(TTL, token exp)."""
+    key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+    decoded = _tokens.get(key)
+    if decoded is not None:
+        return decoded
+
+    decoded = firebase_auth.verify_id_token(id_token)
+    expires_at = min(time.time() + TOKEN_CACHE_TTL_SECONDS, float(decoded.get("exp") or 0))
+    if expires_at > time.time():
+        _tokens.set(key, decoded, expires_at)
+    return decoded
+
+
+def get_cached_username(uid: str) -> Optional[str]:
+    return _usernames.get(uid)
+
+
+def cache_username(uid: str, username: str) -> None:
+    _usernames.set(uid, username, time.time() + USERNAME_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(uid: str) -> None:
+    _usernames.invalidate(uid)
+
+
+def auth_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {"tokens": _tokens.stats(), "usernames": _usernames.stats()}
@@ -0,0 +1,360 @@
+"""
+Offline benchmarks for the analyze and support-chat paths.
+
+    python -m src.lib.bench
+    python -m src.lib.bench --suites support_chat,memory_store --requests 200 --out bench_output.txt
+
+Nothing external is touched: X is replaced by timeline_fake_server (still
+scraped with the real Selenium pool, so Chrome must be installed for the
+"analyze" suite), OpenAI by llm_fake_server with --llm-latency-ms, Yahoo by
+seeded price histories for the fixture tickers, Firebase by the in-memory
+Firestore fake plus a stand-in token check. Caches, chat logs and SQLite
+files go to a temp directory.
+
+Prints one JSON document: per suite, count/errors/seconds/throughput and
+p50/p95/p99/max latency in ms, so runs can be diffed over time. The app's
+own logging shares stdout, so use --out for a clean file.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .llm_fake_server import start_fake_server
+from .timeline_fake_server import FIXTURE_TICKERS, fixture_tweets, start_fake_timeline
+
+SUITES = ["analyze", "analyze_cached", "support_chat", "memory_store", "transcripts"]
+
+_SUPPORT_QUESTIONS = [
+    "How do I analyze a Twitter account?",
+    "Where can I see my saved snipes?",
+    "What does the reliability score mean?",
+    "How do I change my username?",
+    "Can I export my results?",
+    "Why is my analysis taking so long?",
+]
+_FOLLOW_UPS = ["ok, and then?", "where is that button?", "thanks, what about on mobile?"]
+
+
+def _summary(latencies: List[float], seconds: float, errors: int = 0, **extra: Any) -> Dict[str, Any]:
+    """Latencies in seconds -> count, errors, throughput and p50/p95/p99/max in ms."""
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 2) if ordered else None
+
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughputPerSec": round(len(ordered) / seconds, 2) if seconds else None,
+        "p50Ms": pct(0.50),
+        "p95Ms": pct(0.95),
+        "p99Ms": pct(0.99),
+        "maxMs": round(ordered[-1] * 1000, 2) if ordered else None,
+        **extra,
+    }
+
+
+def _run_concurrently(n: int, concurrency: int, fn: Callable[[int], bool]) -> Dict[str, Any]:
+    """Call fn(i) for i in range(n) on `concurrency` threads; fn returns False on error."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            ok = fn(i)
+        except Exception as e:
+            print(f"❌ bench call {i} failed:", repr(e))
+            ok = False
+        elapsed = time.perf_counter() - t0
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="bench") as pool:
+        list(pool.map(one, range(n)))
+    return _summary(latencies, time.perf_counter() - started, errors)
+
+
+def _stage_summary(timings: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Per-stage p50/p95 (ms) across /analyze job results."""
+    stages: Dict[str, List[float]] = {}
+    for t in timings:
+        for stage, ms in t.items():
+            stages.setdefault(stage, []).append(ms)
+    out = {}
+    for stage, values in sorted(stages.items()):
+        values.sort()
+        out[stage] = {
+            "p50Ms": values[min(len(values) - 1, int(len(values) * 0.5))],
+            "p95Ms": values[min(len(values) - 1, int(len(values) * 0.95))],
+        }
+    return out
+
+
+class Bench:
+    """Owns the stand-ins and the (imported-late) app modules for one run."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.workdir = args.workdir or tempfile.mkdtemp(prefix="snipr-bench-")
+        self.llm_server = start_fake_server(latency_ms=args.llm_latency_ms, token_delay_ms=args.llm_token_delay_ms)
+        self.timeline = start_fake_timeline(
+            latency_ms=args.page_latency_ms, scroll_delay_ms=args.scroll_delay_ms, tweets_per_handle=args.tweets
+        )
+        # module constants are read at import time, so this has to happen before importing the app
+        os.environ.update({
+            "FIRESTORE_FAKE": "1",
+            "BROWSER_POOL_WARM": "0",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "fake",
+            "OPENAI_BASE_URL": self.llm_server.base_url,
+            "SNIPR_X_BASE_URL": self.timeline.base_url,
+            "SNIPR_CACHE_DIR": os.path.join(self.workdir, "cache"),
+            "SNIPR_CHAT_LOG_DIR": os.path.join(self.workdir, "chat_logs"),
+            "SNIPR_CHROME_PROFILE_ROOT": os.path.join(self.workdir, "chrome"),
+            "SCRAPE_SCROLL_WAIT_SECONDS": str(max(1.0, args.scroll_delay_ms / 1000 * 4)),
+            # seeded prices must not be refetched mid-run
+            "PRICE_INTRADAY_TTL_SECONDS": str(24 * 3600),
+        })
+        from . import app as app_module
+        from firebase_admin import auth as firebase_auth
+
+        self.app_module = app_module
+        app_module.limiter.enabled = False
+        # stand-in for Firebase Auth: any bearer token verifies, with the token itself as the uid
+        firebase_auth.verify_id_token = lambda token, *a, **kw: {
+            "uid": token, "email": f"{token}@bench.local", "exp": time.time() + 3600,
+        }
+        self._seed_prices()
+
+    def _seed_prices(self) -> None:
+        import numpy as np
+        from .market_data import seed_history
+
+        today = np.datetime64("today", "D")
+        dates = np.arange(today - np.timedelta64(400, "D"), today + np.timedelta64(1, "D"))
+        for i, ticker in enumerate(FIXTURE_TICKERS):
+            rng = np.random.default_rng(i)
+            close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, len(dates))))
+            seed_history(ticker, dates, close)
+
+    def _analyze(self, handles: List[str]) -> Dict[str, Any]:
+        from .firestore_client import get_db
+
+        db = get_db()
+        timings: List[Dict[str, float]] = []
+        failures: List[str] = []
+
+        def one(i):
+            uid = f"bench-{i}"
+            db.collection("users").document(uid).set({"username": f"bench{i}"})
+            client = self.app_module.app.test_client()
+            headers = {"Authorization": f"Bearer {uid}"}
+            resp = client.post("/analyze", json={"twitterUrl": f"https://x.com/{handles[i]}"}, headers=headers)
+            if resp.status_code != 202:
+                failures.append(f"HTTP {resp.status_code}")
+                return False
+            status_url = resp.get_json()["statusUrl"]
+            deadline = time.monotonic() + self.args.job_timeout
+            while time.monotonic() < deadline:
+                job = client.get(status_url, headers=headers).get_json()
+                if job["status"] == "done":
+                    timings.append(job["result"].get("timings") or {})
+                    return True
+                if job["status"] == "failed":
+                    failures.append(job["error"])
+                    return False
+                time.sleep(0.02)
+            failures.append("timed out")
+            return False
+
+        result = _run_concurrently(len(handles), self.args.concurrency, one)
+        result["stages"] = _stage_summary(timings)
+        if failures:
+            result["firstError"] = failures[0]
+        return result
+
+    def suite_analyze(self) -> Dict[str, Any]:
+        """Cold /analyze: every handle is scraped from the fake timeline with Chrome."""
+        n = self.args.analyze_requests
+        result = self._analyze([f"bench_cold_{i}" for i in range(n)])
+        result["timelineRequests"] = self.timeline.requests
+        return result
+
+    def suite_analyze_cached(self) -> Dict[str, Any]:
+        """/analyze with the handle's tweets already in the tweet cache (no browser)."""
+        from . import tweet_cache
+
+        handles = [f"bench_warm_{i}" for i in range(self.args.analyze_requests)]
+        for handle in handles:
+            tweet_cache.store(handle, fixture_tweets(handle, self.args.tweets))
+        return self._analyze(handles)
+
+    def suite_support_chat(self) -> Dict[str, Any]:
+        """POST /api/support/chat: conversations of --turns messages, run concurrently."""
+        from .response_cache import support_cache_stats
+
+        turns = self.args.turns
+        conversations = max(1, self.args.requests // turns)
+        before = support_cache_stats()["hits"]
+        latencies: List[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def conversation(c):
+            nonlocal errors
+            client = self.app_module.app.test_client()
+            convo_id = f"bench-convo-{c}"
+            for turn in range(turns):
+                message = _SUPPORT_QUESTIONS[c % len(_SUPPORT_QUESTIONS)] if turn == 0 else _FOLLOW_UPS[(turn - 1) % len(_FOLLOW_UPS)]
+                t0 = time.perf_counter()
+                resp = client.post("/api/support/chat", json={
+                    "username": f"bench{c}", "route": "/dashboard", "message": message, "conversationId": convo_id,
+                })
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    if resp.status_code == 200 and resp.get_json().get("reply"):
+                        latencies.append(elapsed)
+                    else:
+                        errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.args.concurrency, thread_name_prefix="bench") as pool:
+            list(pool.map(conversation, range(conversations)))
+        return _summary(
+            latencies, time.perf_counter() - started, errors,
+            conversations=conversations, cacheHits=support_cache_stats()["hits"] - before,
+        )
+
+    def suite_memory_store(self) -> Dict[str, Any]:
+        """append/context-window/recent-messages calls from many threads, each on its own conversations."""
+        from .memory_store import append_message, get_context_window, get_or_create_convo, get_recent_messages
+
+        ops_per_thread = max(1, self.args.requests * 10 // self.args.concurrency)
+
+        def worker(w):
+            latencies = []
+            for i in range(ops_per_thread):
+                convo_id = f"bench-mem-{w}-{i % 20}"
+                t0 = time.perf_counter()
+                get_or_create_convo(convo_id, f"bench{w}")
+                append_message(convo_id, "user" if i % 2 == 0 else "assistant", f"message {i} from worker {w}", route="/dashboard")
+                if i % 3 == 0:
+                    get_context_window(convo_id)
+                else:
+                    get_recent_messages(convo_id)
+                latencies.append(time.perf_counter() - t0)
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.args.concurrency, thread_name_prefix="bench") as pool:
+            latencies = [lat for chunk in pool.map(worker, range(self.args.concurrency)) for lat in chunk]
+        return _summary(latencies, time.perf_counter() - started, threads=self.args.concurrency)
+
+    def suite_transcripts(self) -> Dict[str, Any]:
+        """Snapshot + final writes through the transcript writer; throughput is until everything is on disk."""
+        from .transcripts import flush_transcripts, transcript_writer_stats, upsert_conversation_file
+
+        conversations = self.args.requests
+        messages_per_convo = 12
+        now = datetime.now(timezone.utc).isoformat()
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for c in range(conversations):
+            messages = []
+            for m in range(messages_per_convo):
+                messages.append({"role": "user" if m % 2 == 0 else "assistant", "content": f"bench message {m}", "ts": now})
+                # a snapshot every few messages, like the inactivity timer would, then one final save
+                if m % 4 == 3 or m == messages_per_convo - 1:
+                    convo = {
+                        "conversationId": f"bench-transcript-{c}", "username": f"bench{c % 10}",
+                        "messages": list(messages), "messageCount": len(messages),
+                        "startedAt": now, "lastUpdatedAt": now,
+                    }
+                    t0 = time.perf_counter()
+                    upsert_conversation_file(convo, is_final=m == messages_per_convo - 1)
+                    latencies.append(time.perf_counter() - t0)
+        flushed = flush_transcripts(timeout=120)
+        seconds = time.perf_counter() - started
+        result = _summary(latencies, seconds, 0 if flushed else 1, conversations=conversations)
+        result["conversationsPerSec"] = round(conversations / seconds, 2)
+        result["messagesPerSec"] = round(conversations * messages_per_convo / seconds, 2)
+        result["writer"] = transcript_writer_stats()
+        return result
+
+    def run(self, suites: List[str]) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "gitCommit": _git_commit(),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(self.args).items() if k not in ("out", "workdir")},
+            "workdir": self.workdir,
+            "suites": {},
+        }
+        for name in suites:
+            print(f"🔄 bench: {name}", file=sys.stderr)
+            try:
+                report["suites"][name] = getattr(self, f"suite_{name}")()
+            except Exception as e:
+                print(f"❌ bench suite {name} crashed:", repr(e), file=sys.stderr)
+                report["suites"][name] = {"error": repr(e)}
+        report["llmRequests"] = self.llm_server.requests
+        self.app_module.browser_pool.close_all()
+        return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for /analyze, /api/support/chat, memory_store and transcripts")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"comma separated, from: {', '.join(SUITES)}")
+    parser.add_argument("--requests", type=int, default=60, help="support chat turns / transcript conversations; scales memory_store ops")
+    parser.add_argument("--analyze-requests", type=int, default=6, help="handles per /analyze suite")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=3, help="messages per support conversation")
+    parser.add_argument("--tweets", type=int, default=40, help="fixture tweets per handle")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-token-delay-ms", type=float, default=0)
+    parser.add_argument("--page-latency-ms", type=float, default=50, help="fake timeline page load delay")
+    parser.add_argument("--scroll-delay-ms", type=float, default=150, help="fake timeline delay per page of tweets")
+    parser.add_argument("--job-timeout", type=float, default=180, help="seconds to wait for one /analyze job")
+    parser.add_argument("--workdir", help="where caches and chat logs go (default: a new temp dir)")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)}")
+
+    report = Bench(args).run(suites)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
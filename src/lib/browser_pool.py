@@ -0,0 +1,178 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from . import metrics
+
+# Each slot gets its own Chrome user-data dir so drivers never fight over the profile lock.
+# SNIPR_CHROME_PROFILE_DIRS (comma separated) pins explicit dirs per slot; otherwise
+# slots live under SNIPR_CHROME_PROFILE_ROOT/slot-<n>.
+CHROME_PROFILE_ROOT = os.getenv("SNIPR_CHROME_PROFILE_ROOT", os.path.expanduser("~/.snipr_chrome"))
+CHROME_PROFILE_DIRS = [d.strip() for d in os.getenv("SNIPR_CHROME_PROFILE_DIRS", "").split(",") if d.strip()]
+# One slot per analyze worker plus the batch job's scrapers by default, so a batch never
+# takes the browsers interactive analyses need
+BROWSER_POOL_SIZE = int(os.getenv(
+    "BROWSER_POOL_SIZE",
+    str(int(os.getenv("ANALYZE_WORKERS", "2")) + int(os.getenv("LEADERBOARD_SCRAPE_WORKERS", "2"))),
+))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "25"))
+BROWSER_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "300"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") != "0"
+
+
+class BrowserPoolTimeout(Exception):
+    pass
+
+
+class _Slot:
+    def __init__(self, index: int, user_data_dir: str):
+        self.index = index
+        self.user_data_dir = user_data_dir
+        self.driver: Optional[webdriver.Chrome] = None
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Keeps a fixed number of Chrome drivers alive and hands one out per scrape.
+
+    A driver is recycled after max_uses scrapes, or immediately if a scrape
+    raised a WebDriverException (crashed tab, dead session, ...).
+    """
+
+    def __init__(
+        self,
+        profile_dirs: List[str],
+        max_uses: int = BROWSER_MAX_USES,
+        headless: bool = BROWSER_HEADLESS,
+    ):
+        self._slots = [_Slot(i, d) for i, d in enumerate(profile_dirs)]
+        self._free: "queue.Queue[_Slot]" = queue.Queue()
+        for slot in self._slots:
+            self._free.put(slot)
+        self._max_uses = max_uses
+        self._headless = headless
+
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._started = 0
+        self._recycled = 0
+        self._crashed = 0
+
+    def _options(self, slot: _Slot) -> Options:
+        options = Options()
+        options.add_argument(f"--user-data-dir={slot.user_data_dir}")
+        options.add_argument("--profile-directory=Default")
+        if self._headless:
+            options.add_argument("--headless=new")
+
+        # stability flags
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1400,900")
+        return options
+
+    def _start(self, slot: _Slot) -> None:
+        os.makedirs(slot.user_data_dir, exist_ok=True)
+        with metrics.timed("browser_start"):
+            slot.driver = webdriver.Chrome(options=self._options(slot))
+        slot.uses = 0
+        with self._stats_lock:
+            self._started += 1
+        print(f"✅ Chrome launched for pool slot {slot.index}")
+
+    def _stop(self, slot: _Slot) -> None:
+        driver, slot.driver = slot.driver, None
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ Chrome quit failed for pool slot {slot.index}:", repr(e))
+
+    def warm(self) -> None:
+        """Start drivers for every idle slot that doesn't have one yet."""
+        for _ in range(len(self._slots)):
+            try:
+                slot = self._free.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if slot.driver is None:
+                    self._start(slot)
+            except Exception as e:
+                print(f"❌ Chrome warm-up failed for pool slot {slot.index}:", repr(e))
+            finally:
+                self._free.put(slot)
+
+    @contextmanager
+    def driver(self):
+        t0 = time.monotonic()
+        try:
+            slot = self._free.get(timeout=BROWSER_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise BrowserPoolTimeout("No browser available")
+        waited = time.monotonic() - t0
+        metrics.observe_stage("browser_acquire", waited)
+        with self._stats_lock:
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if slot.driver is None:
+                self._start(slot)
+            try:
+                yield slot.driver
+            except WebDriverException:
+                with self._stats_lock:
+                    self._crashed += 1
+                print(f"⚠️ Chrome crashed in pool slot {slot.index}, recycling")
+                self._stop(slot)
+                raise
+
+            slot.uses += 1
+            if slot.uses >= self._max_uses:
+                with self._stats_lock:
+                    self._recycled += 1
+                self._stop(slot)
+        finally:
+            self._free.put(slot)
+
+    def close_all(self) -> None:
+        for slot in self._slots:
+            self._stop(slot)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "size": len(self._slots),
+                "idle": self._free.qsize(),
+                "acquired": self._acquired,
+                "waitSecondsTotal": round(self._wait_total, 3),
+                "waitSecondsAvg": round(self._wait_total / self._acquired, 3) if self._acquired else 0.0,
+                "waitSecondsMax": round(self._wait_max, 3),
+                "started": self._started,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+            }
+
+
+def _profile_dirs() -> List[str]:
+    if CHROME_PROFILE_DIRS:
+        return CHROME_PROFILE_DIRS
+    return [os.path.join(CHROME_PROFILE_ROOT, f"slot-{i}") for i in range(BROWSER_POOL_SIZE)]
+
+
+browser_pool = BrowserPool(_profile_dirs())
+atexit.register(browser_pool.close_all)
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from .llm_gateway import llm
+from .local_db import LocalDB
+from .symbol_index import resolve_symbol
+
+CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "gpt-4o-mini")
+# Rough input budget per request; a batch also never holds more than CLASSIFIER_BATCH_MAX_TWEETS
+CLASSIFIER_BATCH_TOKENS = int(os.getenv("CLASSIFIER_BATCH_TOKENS", "2000"))
+CLASSIFIER_BATCH_MAX_TWEETS = int(os.getenv("CLASSIFIER_BATCH_MAX_TWEETS", "25"))
+CLASSIFIER_CONCURRENCY = int(os.getenv("CLASSIFIER_CONCURRENCY", "4"))
+
+SENTIMENTS = ("bullish", "bearish")
+
+SYSTEM_PROMPT = "You are a financial analysis assistant."
+
+# Structured output: the API guarantees the reply parses and matches this shape
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "tweet_calls",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "calls": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "ticker": {"type": "string"},
+                                        "sentiment": {"type": "string", "enum": list(SENTIMENTS)},
+                                    },
+                                    "required": ["ticker", "sentiment"],
+                                    "additionalProperties": False,
+                                },
+                            },
+                        },
+                        "required": ["id", "calls"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+_executor = ThreadPoolExecutor(max_workers=CLASSIFIER_CONCURRENCY, thread_name_prefix="classify")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    key        TEXT PRIMARY KEY,
+    calls      TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+_db = LocalDB(os.getenv("CLASSIFIER_CACHE_PATH", "classifications.sqlite3"), _SCHEMA)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "batches": 0,
+    "batchErrors": 0,
+    "tweetsClassified": 0,
+    "cacheHits": 0,
+    "cacheMisses": 0,
+    "rejectedTickers": 0,
+    # tweets the model didn't answer for (bad JSON, truncated output, skipped ids); not cached
+    "unanswered": 0,
+    "promptTokens": 0,
+    "completionTokens": 0,
+    "latencySecondsTotal": 0.0,
+}
+_recent_batches: deque = deque(maxlen=100)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+# Bumped when what's stored changes. v2 stores the model's calls as returned, before
+# symbol validation; v1 entries had unknown tickers already dropped and can't be re-checked.
+_CACHE_VERSION = "v2"
+
+
+def _cache_key(text: str, model: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{_CACHE_VERSION}\n{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _load_cached(keys: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    found = {}
+    # stay well under SQLite's bound-parameter limit
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        rows = _db.query(
+            f"SELECT key, calls FROM classifications WHERE key IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        for r in rows:
+            found[r["key"]] = json.loads(r["calls"])
+    return found
+
+
+def _store_cached(entries: List[Tuple[str, List[Dict[str, str]]]]) -> None:
+    now = time.time()
+    with _db.transaction() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO classifications (key, calls, created_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(calls), now) for key, calls in entries],
+        )
+
+
+def _make_batches(items: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+    """Greedily pack (index, tweet) pairs into batches under the token budget."""
+    batches, current, used = [], [], 0
+    for idx, text in items:
+        cost = estimate_tokens(text) + 8
+        if current and (used + cost > CLASSIFIER_BATCH_TOKENS or len(current) >= CLASSIFIER_BATCH_MAX_TWEETS):
+            batches.append(current)
+            current, used = [], 0
+        current.append((idx, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _clean_calls(raw: Any) -> List[Dict[str, str]]:
+    """
+    Keep well-formed calls on real symbols. Tickers are resolved through the
+    symbol index ($cashtags, aliases, share classes); anything it doesn't know
+    is dropped here, before it can cost a market-data lookup.
+    """
+    calls, seen, rejected = [], set(), 0
+    for call in raw or []:
+        if not isinstance(call, dict):
+            continue
+        sentiment = str(call.get("sentiment") or "").strip().lower()
+        if sentiment not in SENTIMENTS:
+            continue
+        ticker = resolve_symbol(str(call.get("ticker") or ""))
+        if not ticker:
+            rejected += 1
+            continue
+        if (ticker, sentiment) not in seen:
+            seen.add((ticker, sentiment))
+            calls.append({"ticker": ticker, "sentiment": sentiment})
+    if rejected:
+        with _metrics_lock:
+            _metrics["rejectedTickers"] += rejected
+    return calls
+
+
+def _classify_batch(batch: List[Tuple[int, str]], model: str) -> Dict[int, List[Dict[str, str]]]:
+    numbered = "\n\n".join(f"[{pos}] {text}" for pos, (_, text) in enumerate(batch))
+    prompt = f"""
+Analyze the following tweets for stock-related calls.
+For each tweet, list every ticker it makes a call on, labeled 'bullish' or 'bearish' based on what the user said.
+Tweets without a stock call get an empty list.
+Use the ticker symbol (e.g. AAPL, BRK.B, BTC), not the company name.
+Return one entry per tweet id.
+
+Tweets:
+{numbered}
+""".strip()
+
+    t0 = time.monotonic()
+    try:
+        resp = llm.chat(
+            "classify",
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            max_tokens=100 + 60 * len(batch),
+            response_format=RESPONSE_FORMAT,
+        )
+    except Exception:
+        with _metrics_lock:
+            _metrics["batchErrors"] += 1
+        raise
+    latency = time.monotonic() - t0
+
+    usage = getattr(resp, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    with _metrics_lock:
+        _metrics["batches"] += 1
+        _metrics["tweetsClassified"] += len(batch)
+        _metrics["promptTokens"] += prompt_tokens
+        _metrics["completionTokens"] += completion_tokens
+        _metrics["latencySecondsTotal"] += latency
+        _recent_batches.append({
+            "tweets": len(batch),
+            "promptTokens": prompt_tokens,
+            "completionTokens": completion_tokens,
+            "latencyMs": round(latency * 1000, 1),
+        })
+    print(f"✅ Classified batch of {len(batch)} tweets in {latency * 1000:.0f}ms ({prompt_tokens}+{completion_tokens} tokens)")
+
+    choice = resp.choices[0]
+    content = (choice.message.content or "").strip()
+    results = []
+    if getattr(choice, "finish_reason", None) == "length":
+        # truncated output: whatever parses may be missing calls, so none of it is trusted
+        print(f"⚠️ Classifier output truncated at {completion_tokens} tokens; batch of {len(batch)} left uncached")
+    else:
+        try:
+            results = json.loads(content).get("results") or []
+        except Exception:
+            print("⚠️ Classifier returned invalid JSON:", content[:200])
+
+    # raw calls per position, as the model gave them
+    by_pos = {}
+    for entry in results:
+        if isinstance(entry, dict) and isinstance(entry.get("id"), int) and 0 <= entry["id"] < len(batch):
+            calls = entry.get("calls")
+            by_pos[entry["id"]] = calls if isinstance(calls, list) else []
+
+    # tweets the model didn't answer for count as "no call" this time, but aren't cached,
+    # so the next analysis asks again
+    out = {idx: _clean_calls(by_pos.get(pos)) for pos, (idx, _) in enumerate(batch)}
+    unanswered = len(batch) - len(by_pos)
+    if unanswered:
+        with _metrics_lock:
+            _metrics["unanswered"] += unanswered
+    # cache as soon as the batch lands, so a failure elsewhere doesn't waste it. The raw
+    # calls are stored so a wider symbol list applies to them without reclassifying.
+    _store_cached([(_cache_key(text, model), by_pos[pos]) for pos, (_, text) in enumerate(batch) if pos in by_pos])
+    return out
+
+
+def analyze_tweets(tweets: List[str], model: str = CLASSIFIER_MODEL) -> List[List[Dict[str, str]]]:
+    """
+    Extract stock calls from each tweet.
+
+    Returns one list of {"ticker", "sentiment"} per input tweet, in order.
+    Tweets already classified with the same model (by text hash) come from
+    the local cache; the rest are split into token-budgeted batches and sent
+    concurrently.
+    """
+    keys = [_cache_key(t, model) for t in tweets]
+    cached = _load_cached(list(set(keys)))
+
+    results: List[List[Dict[str, str]]] = [[] for _ in tweets]
+    pending: Dict[str, Tuple[int, str]] = {}
+    waiting: Dict[str, List[int]] = {}
+    for i, (key, text) in enumerate(zip(keys, tweets)):
+        if key in cached:
+            # cached calls are raw model output; validate against the current symbol list
+            results[i] = _clean_calls(cached[key])
+            continue
+        pending.setdefault(key, (i, text))
+        waiting.setdefault(key, []).append(i)
+
+    with _metrics_lock:
+        _metrics["cacheHits"] += len(tweets) - sum(len(v) for v in waiting.values())
+        _metrics["cacheMisses"] += sum(len(v) for v in waiting.values())
+
+    if not pending:
+        return results
+
+    batches = _make_batches(list(pending.values()))
+    futures = [_executor.submit(_classify_batch, batch, model) for batch in batches]
+
+    for future in futures:
+        for idx, calls in future.result().items():
+            for j in waiting[keys[idx]]:
+                results[j] = calls
+    return results
+
+
+def classifier_stats() -> Dict[str, Any]:
+    with _metrics_lock:
+        stats = dict(_metrics)
+        stats["recentBatches"] = list(_recent_batches)
+    return stats
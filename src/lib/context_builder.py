@@ -0,0 +1,131 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from .llm_gateway import llm
+from .memory_store import get_context_window, apply_summary
+
+# Token budget for raw conversation turns sent with each support request
+CONTEXT_HISTORY_TOKENS = int(os.getenv("SUPPORT_CONTEXT_HISTORY_TOKENS", "1200"))
+SUMMARY_MODEL = os.getenv("SUPPORT_SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_TOKENS = 250
+
+# Exact counts when tiktoken is installed, ~4 chars/token otherwise
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+_summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    # role/formatting overhead per chat message
+    return count_tokens(message.get("content") or "") + 4
+
+
+def _fold(conversation_id: str, summary: str, turns: List[Dict[str, Any]]) -> None:
+    try:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+        resp = llm.chat(
+            "summary",
+            model=SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You maintain a running summary of a support chat for the Snipr app. "
+                        "Update the summary with the new turns. Keep what the user wanted, what was "
+                        "answered, and anything unresolved. Plain text, under 120 words."
+                    ),
+                },
+                {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            temperature=0.0,
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        new_summary = (resp.choices[0].message.content or "").strip()
+        if new_summary and apply_summary(conversation_id, new_summary, turns[-1]["seq"] + 1):
+            print(f"✅ Folded {len(turns)} turns into summary for convo={conversation_id}")
+    except Exception as e:
+        print(f"⚠️ Summary fold failed for convo={conversation_id}:", repr(e))
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(conversation_id)
+
+
+def _schedule_fold(conversation_id: str, summary: str, turns: List[Dict[str, Any]]) -> None:
+    with _in_flight_lock:
+        if conversation_id in _in_flight:
+            return
+        _in_flight.add(conversation_id)
+    _summarizer.submit(_fold, conversation_id, summary, turns)
+
+
+def build_context(
+    system_prompt: str, conversation_id: str, excerpts: str = ""
+) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+    """
+    Chat messages for the next completion: system prompt, running summary,
+    then the most recent turns that fit CONTEXT_HISTORY_TOKENS.
+
+    `excerpts` (per-message material such as retrieved knowledge) goes in a
+    system message right before the latest turn, so everything ahead of it
+    stays identical from one request to the next and can hit the provider's
+    prompt prefix cache.
+
+    Turns that fall out of the window are folded into the conversation's
+    summary in the background. Until that lands they stay in the prompt, so
+    nothing is dropped in the meantime.
+
+    Returns (messages, info) where info has the estimated prompt token count.
+    """
+    window = get_context_window(conversation_id)
+    history = window["messages"]
+    summary = window["summary"]
+    summarized_through = window["summarizedThrough"]
+
+    # newest turns first until the budget runs out; always keep the latest message
+    used = 0
+    start = len(history)
+    while start > 0:
+        cost = message_tokens(history[start - 1])
+        if start < len(history) and used + cost > CONTEXT_HISTORY_TOKENS:
+            break
+        used += cost
+        start -= 1
+
+    to_fold = [m for m in history[:start] if m["seq"] >= summarized_through]
+    if to_fold:
+        _schedule_fold(conversation_id, summary, to_fold)
+        # not in the summary yet: keep them verbatim for this turn
+        start -= len(to_fold)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    messages += [{"role": m["role"], "content": m["content"]} for m in history[start:]]
+    if excerpts:
+        latest = len(messages) - 1 if history else len(messages)
+        messages.insert(latest, {"role": "system", "content": excerpts})
+
+    info = {
+        "promptTokens": sum(message_tokens(m) for m in messages),
+        "historyMessages": len(history) - start,
+        "totalMessages": len(history),
+        "pendingFold": len(to_fold),
+    }
+    return messages, info
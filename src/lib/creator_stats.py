@@ -0,0 +1,184 @@
+import hashlib
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from .local_db import LocalDB
+from .scoring import HORIZONS, PRIMARY_HORIZON, call_day
+
+_SCHEMA = """
+-- every (call, horizon) already folded into the aggregates; the primary key makes folding idempotent
+CREATE TABLE IF NOT EXISTS scored_calls (
+    creator   TEXT NOT NULL,
+    call_id   TEXT NOT NULL,
+    horizon   TEXT NOT NULL,
+    ticker    TEXT NOT NULL,
+    bucket    TEXT NOT NULL,
+    correct   INTEGER NOT NULL,
+    PRIMARY KEY (creator, call_id, horizon)
+);
+
+-- running counts per creator, by dimension: ('all', ''), ('ticker', 'AAPL'), ('month', '2025-06')
+CREATE TABLE IF NOT EXISTS creator_aggregates (
+    creator   TEXT NOT NULL,
+    dim       TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    horizon   TEXT NOT NULL,
+    correct   INTEGER NOT NULL DEFAULT 0,
+    total     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (creator, dim, key, horizon)
+);
+CREATE INDEX IF NOT EXISTS aggregates_by_horizon ON creator_aggregates (dim, horizon, total);
+"""
+
+_db = LocalDB(os.getenv("CREATOR_STATS_PATH", "creator_stats.sqlite3"), _SCHEMA)
+
+
+def _purge_undated() -> None:
+    """Back out calls folded under the old "undated" bucket, which were scored against a made-up date."""
+    with _db.transaction() as conn:
+        rows = conn.execute(
+            "SELECT creator, horizon, ticker, correct FROM scored_calls WHERE bucket = 'undated'"
+        ).fetchall()
+        if not rows:
+            return
+        deltas = defaultdict(lambda: [0, 0])
+        for creator, h, ticker, ok in rows:
+            for dim, key in (("all", ""), ("ticker", ticker), ("month", "undated")):
+                deltas[(creator, dim, key, h)][0] += ok
+                deltas[(creator, dim, key, h)][1] += 1
+        conn.executemany(
+            "UPDATE creator_aggregates SET correct = correct - ?, total = total - ? "
+            "WHERE creator = ? AND dim = ? AND key = ? AND horizon = ?",
+            [(c, t, creator, dim, key, h) for (creator, dim, key, h), (c, t) in deltas.items()],
+        )
+        conn.execute("DELETE FROM creator_aggregates WHERE total <= 0")
+        conn.execute("DELETE FROM scored_calls WHERE bucket = 'undated'")
+    print(f"🧮 Removed {len(rows)} undated calls from running stats")
+
+
+_purge_undated()
+
+# Creators need this many matured calls before they are ranked
+LEADERBOARD_MIN_CALLS = int(os.getenv("LEADERBOARD_MIN_CALLS", "5"))
+
+
+def _creator(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+def call_id(call: Dict[str, Any]) -> str:
+    """Stable id for one call: the tweet it came from plus ticker and direction."""
+    source = call.get("tweetHash") or call.get("postedAt") or ""
+    return hashlib.sha1(f"{source}|{call['ticker']}|{call['sentiment']}".encode("utf-8")).hexdigest()
+
+
+def _bucket(call: Dict[str, Any]) -> Optional[str]:
+    """The call's month, or None for a call without a valid timestamp (never folded)."""
+    day = call_day(call.get("postedAt"))
+    return None if day is None else str(day)[:7]
+
+
+def fold(username: str, calls: List[Dict[str, Any]], scored: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add newly matured calls to a creator's running counts.
+
+    `calls` and `scored` are what fact_check scored (score_calls output).
+    Only horizons that have fully elapsed are final, so only those are folded;
+    a call still inside its window is picked up by a later run. Calls already
+    folded are skipped, so the cost is O(new calls) and re-running is safe.
+    Calls without a valid timestamp are never folded: their results can't be dated.
+
+    Returns the creator's totals (see totals()).
+    """
+    creator = _creator(username)
+    candidates = []
+    for h in HORIZONS:
+        matured = scored.get("matured", {}).get(h)
+        if matured is None:
+            continue
+        correct = scored["correct"][h]
+        for i, call in enumerate(calls):
+            bucket = _bucket(call)
+            if matured[i] and bucket is not None:
+                candidates.append((creator, call_id(call), h, call["ticker"], bucket, int(bool(correct[i]))))
+
+    if candidates:
+        with _db.transaction() as conn:
+            deltas = defaultdict(lambda: [0, 0])
+            for row in candidates:
+                if conn.execute(
+                    "INSERT OR IGNORE INTO scored_calls (creator, call_id, horizon, ticker, bucket, correct) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    row,
+                ).rowcount:
+                    _, _, h, ticker, bucket, ok = row
+                    for dim, key in (("all", ""), ("ticker", ticker), ("month", bucket)):
+                        deltas[(dim, key, h)][0] += ok
+                        deltas[(dim, key, h)][1] += 1
+            conn.executemany(
+                """
+                INSERT INTO creator_aggregates (creator, dim, key, horizon, correct, total)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(creator, dim, key, horizon) DO UPDATE SET
+                    correct = correct + excluded.correct,
+                    total = total + excluded.total
+                """,
+                [(creator, dim, key, h, c, t) for (dim, key, h), (c, t) in deltas.items()],
+            )
+        new = sum(t for (dim, _, _), (_, t) in deltas.items() if dim == "all")
+        if new:
+            print(f"📊 Folded {new} matured calls into running stats for @{creator}")
+    return totals(creator)
+
+
+def _reliability(correct: int, total: int) -> int:
+    return round(correct / total * 100) if total else 0
+
+
+def totals(username: str) -> Dict[str, Any]:
+    """
+    {"reliability", "correct", "total"} at the primary horizon plus
+    "horizons": {horizon: {"correct", "total", "reliability"}}.
+    """
+    rows = _db.query(
+        "SELECT horizon, correct, total FROM creator_aggregates WHERE creator = ? AND dim = 'all'",
+        (_creator(username),),
+    )
+    horizons = {h: {"correct": 0, "total": 0, "reliability": 0} for h in HORIZONS}
+    for r in rows:
+        horizons[r["horizon"]] = {"correct": r["correct"], "total": r["total"], "reliability": _reliability(r["correct"], r["total"])}
+    primary = horizons[PRIMARY_HORIZON]
+    return {**primary, "horizons": horizons}
+
+
+def breakdown(username: str, horizon: str = PRIMARY_HORIZON) -> Dict[str, Dict[str, Any]]:
+    """Running counts for one creator by ticker and by month at one horizon."""
+    rows = _db.query(
+        "SELECT dim, key, correct, total FROM creator_aggregates WHERE creator = ? AND horizon = ? AND dim != 'all'",
+        (_creator(username), horizon),
+    )
+    out: Dict[str, Dict[str, Any]] = {"ticker": {}, "month": {}}
+    for r in rows:
+        out[r["dim"]][r["key"]] = {"correct": r["correct"], "total": r["total"], "reliability": _reliability(r["correct"], r["total"])}
+    return out
+
+
+def top_creators(
+    horizon: str = PRIMARY_HORIZON, limit: int = 50, min_calls: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Creators ranked by running reliability, read straight from the aggregates."""
+    min_calls = LEADERBOARD_MIN_CALLS if min_calls is None else min_calls
+    rows = _db.query(
+        """
+        SELECT creator, correct, total FROM creator_aggregates
+        WHERE dim = 'all' AND key = '' AND horizon = ? AND total >= ?
+        ORDER BY CAST(correct AS REAL) / total DESC, total DESC
+        LIMIT ?
+        """,
+        (horizon, int(min_calls), int(limit)),
+    )
+    return [
+        {"username": r["creator"], "reliability": _reliability(r["correct"], r["total"]), "correct": r["correct"], "total": r["total"]}
+        for r in rows
+    ]
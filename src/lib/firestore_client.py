@@ -0,0 +1,36 @@
+import os
+import threading
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from .firestore_fake import InMemoryFirestore
+
+# FIRESTORE_FAKE=1 swaps in an in-memory fake for offline runs. The real client also
+# honours FIRESTORE_EMULATOR_HOST if you'd rather point it at the Firestore emulator.
+FIRESTORE_FAKE = os.getenv("FIRESTORE_FAKE", "0") == "1"
+
+_lock = threading.Lock()
+_db = None
+
+
+def init_firebase() -> None:
+    if FIRESTORE_FAKE:
+        return
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("serviceAccountKey.json")
+        firebase_admin.initialize_app(cred)
+
+
+def get_db():
+    """One Firestore client (and its gRPC channel) shared by every request."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                if FIRESTORE_FAKE:
+                    _db = InMemoryFirestore()
+                else:
+                    init_firebase()
+                    _db = firestore.client()
+    return _db
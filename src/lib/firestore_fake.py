@@ -0,0 +1,94 @@
+import copy
+import threading
+from typing import Any, Dict, Optional
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+
+class FakeDocumentReference:
+    def __init__(self, store: "InMemoryFirestore", collection: str, doc_id: str):
+        self._store = store
+        self.collection_name = collection
+        self.id = doc_id
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._store._write(self.collection_name, self.id, data, merge)
+
+    def get(self) -> FakeDocumentSnapshot:
+        return FakeDocumentSnapshot(self.id, self._store._read(self.collection_name, self.id))
+
+
+class FakeCollectionReference:
+    def __init__(self, store: "InMemoryFirestore", name: str):
+        self._store = store
+        self.name = name
+
+    def document(self, doc_id: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self._store, self.name, doc_id)
+
+    def stream(self):
+        with self._store._lock:
+            docs = list(self._store.collections.get(self.name, {}).items())
+        for doc_id, data in docs:
+            yield FakeDocumentSnapshot(doc_id, copy.deepcopy(data))
+
+
+class FakeWriteBatch:
+    def __init__(self, store: "InMemoryFirestore"):
+        self._store = store
+        self._ops = []
+
+    def set(self, ref: FakeDocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._ops.append((ref.collection_name, ref.id, data, merge))
+
+    def commit(self) -> None:
+        self._store.batch_commits += 1
+        if self._store.fail_next_commits > 0:
+            self._store.fail_next_commits -= 1
+            raise RuntimeError("fake Firestore commit failure")
+        with self._store._lock:
+            for collection, doc_id, data, merge in self._ops:
+                self._store._write(collection, doc_id, data, merge)
+
+
+class InMemoryFirestore:
+    """
+    Minimal stand-in for firestore.Client covering what the backend uses
+    (collection/document set+get, stream, batch writes). Enabled with
+    FIRESTORE_FAKE=1 for offline runs; set fail_next_commits to exercise retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.batch_commits = 0
+        self.fail_next_commits = 0
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def _write(self, collection: str, doc_id: str, data: Dict[str, Any], merge: bool) -> None:
+        with self._lock:
+            docs = self.collections.setdefault(collection, {})
+            if merge and doc_id in docs:
+                docs[doc_id].update(copy.deepcopy(data))
+            else:
+                docs[doc_id] = copy.deepcopy(data)
+
+    def _read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.collections.get(collection, {}).get(doc_id)
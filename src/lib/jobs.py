@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+# Bounded pool that runs long /analyze pipelines off the Flask request thread
+ANALYZE_WORKERS = int(os.getenv("ANALYZE_WORKERS", "2"))
+ANALYZE_MAX_PENDING = int(os.getenv("ANALYZE_MAX_PENDING", "20"))
+# Batch (leaderboard) jobs get their own smaller pool so they never hold every analyze worker
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "1"))
+BATCH_MAX_PENDING = int(os.getenv("BATCH_MAX_PENDING", "4"))
+
+# Finished jobs stay pollable for this long
+JOB_TTL_SECONDS = int(os.getenv("ANALYZE_JOB_TTL_SECONDS", "900"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key: str):
+        self.id = str(uuid4())
+        self.key = key
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.createdAt = datetime.utcnow().isoformat()
+        self.finishedAt: Optional[str] = None
+        self._finished_mono: Optional[float] = None
+        self._callbacks: List[Callable[["Job"], None]] = []
+
+    def update(self, stage: str, progress: float) -> None:
+        """Called by the pipeline as it moves between stages."""
+        self.stage = stage
+        self.progress = round(max(0.0, min(1.0, progress)), 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "key": self.key,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.createdAt,
+            "finishedAt": self.finishedAt,
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on a bounded worker pool.
+
+    Jobs are de-duplicated by key: while a job for a key is queued or running,
+    submitting the same key attaches to the existing job instead of starting
+    a new one. Each submitter can register an on_done callback, which runs on
+    the worker thread once the shared job finishes.
+    """
+
+    def __init__(self, max_workers: int = ANALYZE_WORKERS, max_pending: int = ANALYZE_MAX_PENDING, name: str = "analyze"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_key: Dict[str, Job] = {}
+
+    def submit(
+        self,
+        key: str,
+        fn: Callable[..., Dict[str, Any]],
+        *args: Any,
+        on_done: Optional[Callable[[Job], None]] = None,
+    ) -> Job:
+        with self._lock:
+            self._prune_locked()
+
+            job = self._active_by_key.get(key)
+            if job:
+                if on_done:
+                    job._callbacks.append(on_done)
+                return job
+
+            if len(self._active_by_key) >= self._max_pending:
+                raise QueueFullError("Analysis queue is full")
+
+            job = Job(key)
+            if on_done:
+                job._callbacks.append(on_done)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "active": len(self._active_by_key),
+                "tracked": len(self._jobs),
+            }
+
+    def _run(self, job: Job, fn: Callable[..., Dict[str, Any]], args: tuple) -> None:
+        job.status = "running"
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+            job.update("done", 1.0)
+        except Exception as e:
+            print(f"❌ Job {job.id} ({job.key}) failed:", repr(e))
+            job.error = str(e) or e.__class__.__name__
+            job.status = "failed"
+
+        with self._lock:
+            job.finishedAt = datetime.utcnow().isoformat()
+            job._finished_mono = time.monotonic()
+            if self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
+            callbacks, job._callbacks = job._callbacks, []
+
+        for cb in callbacks:
+            try:
+                cb(job)
+            except Exception as e:
+                print(f"❌ Job {job.id} callback failed:", repr(e))
+
+    def _prune_locked(self) -> None:
+        cutoff = time.monotonic() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job._finished_mono is not None and job._finished_mono < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+analyze_jobs = JobQueue()
+batch_jobs = JobQueue(BATCH_WORKERS, BATCH_MAX_PENDING, name="batch")
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    """A job from either queue; ids are UUIDs, so they never collide."""
+    return analyze_jobs.get(job_id) or batch_jobs.get(job_id)
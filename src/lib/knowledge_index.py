@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .knowledge_loader import KNOWLEDGE_DIR, knowledge_signature, scan_knowledge
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+# Chunks from the doc describing the user's current page get their score multiplied by this
+ROUTE_BOOST = 1.5
+TOP_K = int(os.getenv("SUPPORT_KNOWLEDGE_TOP_K", "5"))
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "of", "in", "on", "for", "is", "are", "it", "i", "my",
+    "me", "do", "does", "how", "what", "where", "can", "you", "your", "this", "that", "with",
+    "be", "by", "at", "as", "from", "if", "there", "they", "their", "its", "am", "was", "will",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PATH_RE = re.compile(r"`(/[^`\s]*)`")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in _STOPWORDS:
+            continue
+        # crude plural folding so "snipes" matches "snipe"
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _route_tokens(route: Optional[str]) -> List[str]:
+    return tokenize(re.sub(r"[-_/]", " ", route or ""))
+
+
+class Chunk:
+    __slots__ = ("source", "heading", "text")
+
+    def __init__(self, source: str, heading: str, text: str):
+        self.source = source
+        self.heading = heading
+        self.text = text
+
+    def render(self) -> str:
+        return f"### {self.heading} ({self.source})\n{self.text}"
+
+
+def chunk_markdown(source: str, content: str) -> List[Chunk]:
+    """Split a doc at headings; each chunk carries its heading path, e.g. 'Your Snipes > Features'."""
+    chunks: List[Chunk] = []
+    stack: List[Tuple[int, str]] = []
+    body: List[str] = []
+
+    def flush():
+        text = "\n".join(body).strip()
+        if text and stack:
+            chunks.append(Chunk(source, " > ".join(h for _, h in stack), text))
+        body.clear()
+
+    for line in content.splitlines():
+        m = re.match(r"^(#{1,6})\s+(.*)$", line)
+        if m:
+            flush()
+            level = len(m.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, m.group(2).strip()))
+        else:
+            body.append(line)
+    flush()
+    return chunks
+
+
+class KnowledgeIndex:
+    """
+    BM25 over heading-level chunks of src/knowledge/*.md, held in NumPy arrays.
+
+    refresh() rebuilds only when the set of files or any file's mtime changed.
+    """
+
+    def __init__(self, directory: str = KNOWLEDGE_DIR):
+        self._dir = directory
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[Tuple[str, float], ...]] = None
+        self.chunks: List[Chunk] = []
+        self._vocab: Dict[str, int] = {}
+        self._tf = np.zeros((0, 0), dtype=np.float32)
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._route_sources: Dict[str, str] = {}
+
+    def refresh(self, signature: Optional[Tuple[Tuple[str, float], ...]] = None) -> bool:
+        """Rebuild if the knowledge files changed. Returns True if a rebuild happened."""
+        signature = signature or scan_knowledge(self._dir)
+        if signature == self._signature:
+            return False
+
+        chunks: List[Chunk] = []
+        route_sources: Dict[str, str] = {}
+        for filename, _ in signature:
+            with open(os.path.join(self._dir, filename), "r") as f:
+                content = f.read()
+            file_chunks = chunk_markdown(filename, content)
+            chunks += file_chunks
+            # docs name their page under a "Path" heading, e.g. `/your-snipes`
+            for chunk in file_chunks:
+                if chunk.heading.endswith("> Path"):
+                    for path in _PATH_RE.findall(chunk.text):
+                        route_sources[path.rstrip("/") or "/"] = filename
+
+        docs = [tokenize(f"{c.heading} {c.text}") for c in chunks]
+        vocab: Dict[str, int] = {}
+        for doc in docs:
+            for tok in doc:
+                vocab.setdefault(tok, len(vocab))
+
+        tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for tok in doc:
+                tf[row, vocab[tok]] += 1
+
+        df = (tf > 0).sum(axis=0)
+        n = max(len(docs), 1)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        doc_len = tf.sum(axis=1)
+
+        with self._lock:
+            self.chunks = chunks
+            self._vocab = vocab
+            self._tf = tf
+            self._idf = idf
+            self._doc_len = doc_len
+            self._route_sources = route_sources
+            self._signature = signature
+        print(f"✅ Knowledge index built: {len(chunks)} chunks from {len(signature)} files")
+        return True
+
+    def search(self, query: str, route: Optional[str] = None, k: int = TOP_K) -> List[Chunk]:
+        with self._lock:
+            chunks, vocab, tf, idf, doc_len = self.chunks, self._vocab, self._tf, self._idf, self._doc_len
+            route_source = self._route_sources.get((route or "").rstrip("/") or "/")
+        if not chunks:
+            return []
+
+        terms = [vocab[t] for t in set(tokenize(query) + _route_tokens(route)) if t in vocab]
+        scores = np.zeros(len(chunks), dtype=np.float32)
+        if terms:
+            f = tf[:, terms]
+            avg_len = doc_len.mean() or 1.0
+            denom = f + K1 * (1 - B + B * doc_len[:, None] / avg_len)
+            scores = (idf[terms] * f * (K1 + 1) / denom).sum(axis=1)
+        if route_source:
+            boost = np.array([c.source == route_source for c in chunks])
+            # make the current page's doc win ties even when nothing else matched
+            scores = np.where(boost, scores * ROUTE_BOOST + 1e-3, scores)
+
+        order = np.argsort(-scores, kind="stable")[:k]
+        hits = [chunks[i] for i in order if scores[i] > 0]
+        if hits:
+            return hits
+        # nothing relevant: fall back to the app overview
+        return [c for c in chunks if c.source == "app_overview.md"][:k]
+
+    def outline(self) -> str:
+        """One line per doc listing its sections, e.g. 'Your Snipes: Path, Purpose, Features'."""
+        with self._lock:
+            chunks = self.chunks
+        sections: Dict[str, List[str]] = {}
+        for c in chunks:
+            title, _, rest = c.heading.partition(" > ")
+            names = sections.setdefault(title, [])
+            if rest and rest not in names:
+                names.append(rest)
+        return "\n".join(f"- {title}: {', '.join(names)}" if names else f"- {title}" for title, names in sections.items())
+
+
+knowledge_index = KnowledgeIndex()
+knowledge_index.refresh()
+
+
+def retrieve(query: str, route: Optional[str] = None, k: int = TOP_K) -> str:
+    """Top-k knowledge chunks for a message, rendered for the system prompt."""
+    knowledge_index.refresh(knowledge_signature())
+    return "\n\n".join(c.render() for c in knowledge_index.search(query, route, k))
@@ -1,28 +1,82 @@
+import hashlib
 import os
-from functools import lru_cache
+import threading
+import time
+from typing import Tuple
 
 # Define the base directory for knowledge files
 KNOWLEDGE_DIR = os.path.join(os.path.dirname(__file__), '../knowledge')
 
-@lru_cache(maxsize=1)
+# How often (at most) the knowledge directory is stat'ed for changes
+CHECK_INTERVAL_SECONDS = float(os.getenv("KNOWLEDGE_CHECK_INTERVAL_SECONDS", "2"))
+
+_lock = threading.Lock()
+_signature: Tuple[Tuple[str, float], ...] = ()
+_checked_at = 0.0
+# (signature, combined content, version hash)
+_loaded = None
+
+
+def scan_knowledge(directory: str = KNOWLEDGE_DIR) -> Tuple[Tuple[str, float], ...]:
+    """(filename, mtime) for every .md file in a knowledge directory, uncached."""
+    sig = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.md'):
+            sig.append((filename, os.path.getmtime(os.path.join(directory, filename))))
+    return tuple(sig)
+
+
+def knowledge_signature(force: bool = False) -> Tuple[Tuple[str, float], ...]:
+    """
+    (filename, mtime) for every knowledge file. The directory is re-scanned at
+    most once per CHECK_INTERVAL_SECONDS; in between the last result is reused.
+    """
+    global _signature, _checked_at
+    now = time.monotonic()
+    if force or not _signature or now - _checked_at >= CHECK_INTERVAL_SECONDS:
+        with _lock:
+            if force or not _signature or now - _checked_at >= CHECK_INTERVAL_SECONDS:
+                _signature = scan_knowledge()
+                _checked_at = now
+    return _signature
+
+
 def load_knowledge():
     """
     Load all .md files from the knowledge directory and combine their contents.
-    Uses caching to avoid re-reading files on every request.
+    The result is cached until a file is added, removed or modified.
 
     Returns:
         str: Combined knowledge base content.
     """
+    global _loaded
+    signature = knowledge_signature()
+    loaded = _loaded
+    if loaded and loaded[0] == signature:
+        return loaded[1]
+
     combined_content = ["# Snipr Knowledge Base"]
 
-    for filename in sorted(os.listdir(KNOWLEDGE_DIR)):
-        if filename.endswith('.md'):
-            file_path = os.path.join(KNOWLEDGE_DIR, filename)
-            with open(file_path, 'r') as file:
-                content = file.read()
-                combined_content.append(f"## {filename}\n{content}")
+    for filename, _ in signature:
+        file_path = os.path.join(KNOWLEDGE_DIR, filename)
+        with open(file_path, 'r') as file:
+            content = file.read()
+            combined_content.append(f"## {filename}\n{content}")
+
+    combined = '\n\n'.join(combined_content)
+    version = hashlib.sha256(combined.encode("utf-8")).hexdigest()[:12]
+    # swap in one assignment so readers never see a half-built cache
+    _loaded = (signature, combined, version)
+    if loaded:
+        print(f"🔄 Knowledge base reloaded (version {version})")
+    return combined
+
+
+def knowledge_version():
+    """Short content hash of the current knowledge base; changes whenever any doc changes."""
+    load_knowledge()
+    return _loaded[2]
 
-    return '\n\n'.join(combined_content)
 
 def get_knowledge():
     """
@@ -31,4 +85,4 @@ def get_knowledge():
     Returns:
         str: Combined knowledge base content.
     """
-    return load_knowledge()
\ No newline at end of file
+    return load_knowledge()
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from . import market_data
+from .analysis import build_result, extract_calls, snipe_doc
+from .classifier import analyze_tweets
+from .scoring import price_window
+from .scraper import get_tweets_cached
+from .snipe_writer import snipe_writer
+
+# Per-stage concurrency. The browser pool is sized for ANALYZE_WORKERS plus the scrape workers.
+LEADERBOARD_SCRAPE_WORKERS = int(os.getenv("LEADERBOARD_SCRAPE_WORKERS", "2"))
+LEADERBOARD_CLASSIFY_WORKERS = int(os.getenv("LEADERBOARD_CLASSIFY_WORKERS", "2"))
+# Most handles priced together with one market-data download
+LEADERBOARD_PRICE_BATCH = int(os.getenv("LEADERBOARD_PRICE_BATCH", "25"))
+LEADERBOARD_TWEET_LIMIT = int(os.getenv("LEADERBOARD_TWEET_LIMIT", "30"))
+LEADERBOARD_MAX_HANDLES = int(os.getenv("LEADERBOARD_MAX_HANDLES", "200"))
+# Collection the CLI writes to when no --collection is given
+LEADERBOARD_COLLECTION = os.getenv("LEADERBOARD_COLLECTION", "snipes")
+
+
+def normalize_handles(raw: List[str]) -> List[str]:
+    """'https://x.com/Foo/', '@foo', 'foo' -> 'foo' (first spelling kept), duplicates dropped."""
+    handles, seen = [], set()
+    for item in raw:
+        handle = str(item or "").strip().rstrip("/").split("/")[-1].lstrip("@")
+        if handle and handle.lower() not in seen:
+            seen.add(handle.lower())
+            handles.append(handle)
+    return handles
+
+
+def run_leaderboard(
+    handles: List[str],
+    collection: Optional[str] = LEADERBOARD_COLLECTION,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze many handles as a pipeline: scrape -> classify -> price/score.
+
+    Each stage has its own worker pool, so one handle is being classified
+    while the next is still scraping. The price stage takes every handle
+    that is ready, fetches the union of their tickers with one market-data
+    call, then scores each. Results are queued on the snipe writer as each
+    handle finishes (collection=None skips the writes).
+
+    Returns {"results": {handle: result}, "failed": {handle: error}, "stats": ...}.
+    """
+    handles = normalize_handles(handles)
+    started = time.monotonic()
+    ready: "queue.Queue" = queue.Queue()
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: Dict[str, str] = {}
+    stats = {"handles": len(handles), "priceBatches": 0, "pricedTickers": 0, "tickerMentions": 0}
+    stage_seconds = {"scrape": 0.0, "classify": 0.0, "price": 0.0}
+    stage_lock = threading.Lock()
+
+    def timed(stage, fn, *args, **kwargs):
+        t0 = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with stage_lock:
+                stage_seconds[stage] += time.monotonic() - t0
+
+    def classify(handle, tweets, scrape_stats):
+        try:
+            calls_per_tweet = timed("classify", analyze_tweets, [t["text"] for t in tweets])
+            ready.put((handle, tweets, extract_calls(tweets, calls_per_tweet), scrape_stats, None))
+        except Exception as e:
+            ready.put((handle, None, None, None, f"AI analysis failed: {e}"))
+
+    with ThreadPoolExecutor(LEADERBOARD_SCRAPE_WORKERS, thread_name_prefix="lb-scrape") as scrape_pool, \
+            ThreadPoolExecutor(LEADERBOARD_CLASSIFY_WORKERS, thread_name_prefix="lb-classify") as classify_pool:
+
+        def scrape(handle):
+            scrape_stats = {}
+            try:
+                tweets = timed("scrape", get_tweets_cached, handle, limit=LEADERBOARD_TWEET_LIMIT, stats=scrape_stats)
+            except Exception as e:
+                ready.put((handle, None, None, None, f"Tweet scraping failed: {e}"))
+                return
+            classify_pool.submit(classify, handle, tweets, scrape_stats)
+
+        for handle in handles:
+            scrape_pool.submit(scrape, handle)
+
+        # price stage runs here, taking whatever has finished classifying
+        remaining = len(handles)
+        while remaining:
+            batch = [ready.get()]
+            while len(batch) < LEADERBOARD_PRICE_BATCH:
+                try:
+                    batch.append(ready.get_nowait())
+                except queue.Empty:
+                    break
+            remaining -= len(batch)
+
+            ok = [b for b in batch if b[4] is None]
+            for handle, _, _, _, error in batch:
+                if error:
+                    print(f"❌ Leaderboard @{handle}: {error}")
+                    failed[handle] = error
+
+            all_calls = [c for b in ok for c in b[2]]
+            if all_calls:
+                tickers = sorted({c["ticker"] for c in all_calls})
+                start, today = price_window([c.get("postedAt") for c in all_calls])
+                timed("price", market_data.ensure_history, tickers, start, today)
+                stats["priceBatches"] += 1
+                stats["pricedTickers"] += len(tickers)
+                stats["tickerMentions"] += sum(len({c["ticker"] for c in b[2]}) for b in ok)
+
+            for handle, tweets, calls, scrape_stats, _ in ok:
+                try:
+                    # prices are cached by now, so this is pure computation
+                    result = timed("price", build_result, handle, tweets, calls, scrape_stats)
+                except Exception as e:
+                    failed[handle] = f"Fact check failed: {e}"
+                    continue
+                results[handle] = result
+                if collection and not result.get("message"):
+                    snipe_writer.enqueue(collection, f"@{handle}", snipe_doc(result))
+
+            if on_progress:
+                on_progress(len(handles) - remaining, len(handles))
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    stats["stageSeconds"] = {k: round(v, 2) for k, v in stage_seconds.items()}
+    print(f"✅ Leaderboard run: {len(results)} handles scored, {len(failed)} failed in {stats['seconds']}s")
+    return {"results": results, "failed": failed, "stats": stats}
+
+
+def summarize(run: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rows sorted by reliability, highest first."""
+    rows = [
+        {"username": r["username"], "reliability": r["reliability"], "tickers": r["tickers"], "tweetCount": r["tweetCount"]}
+        for r in run["results"].values()
+    ]
+    return sorted(rows, key=lambda r: r["reliability"], reverse=True)
+
+
+def main(argv=None):
+    from .firestore_client import init_firebase
+
+    parser = argparse.ArgumentParser(description="Analyze many Twitter handles and write their snipes")
+    parser.add_argument("handles", nargs="*", help="handles, @handles or profile URLs")
+    parser.add_argument("--file", help="file with one handle per line")
+    parser.add_argument("--collection", default=LEADERBOARD_COLLECTION, help="Firestore collection for the results")
+    parser.add_argument("--dry-run", action="store_true", help="don't write to Firestore")
+    args = parser.parse_args(argv)
+
+    handles = list(args.handles)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            handles += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not handles:
+        parser.error("no handles given")
+
+    if not args.dry_run:
+        init_firebase()
+    run = run_leaderboard(
+        handles,
+        collection=None if args.dry_run else args.collection,
+        on_progress=lambda done, total: print(f"🔄 {done}/{total} handles done"),
+    )
+    if not args.dry_run:
+        snipe_writer.flush()
+    print(json.dumps({"leaderboard": summarize(run), "failed": run["failed"], "stats": run["stats"]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+A local stand-in for the OpenAI chat completions API, for tests and benchmarks.
+
+    python -m src.lib.llm_fake_server --port 8089
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python -m src.lib.app
+
+Answers are canned but shaped like the real thing for each caller:
+classifier batches get {"results": [...]} built from $cashtags, support chat
+gets the {"reply", "missing_feature", "feature_request"} JSON, anything else
+gets a short plain-text answer. Streaming (SSE) is supported.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+_CASHTAG_RE = re.compile(r"\$([A-Za-z][A-Za-z.]{0,5})\b")
+_BEARISH_RE = re.compile(r"\b(short|shorting|puts?|bearish|dump|sell|overvalued)\b", re.I)
+_TWEET_RE = re.compile(r"^\[(\d+)\] (.*)$")
+
+
+def _classify(prompt: str) -> str:
+    results = []
+    current: Optional[Tuple[int, List[str]]] = None
+    for line in prompt.splitlines():
+        m = _TWEET_RE.match(line)
+        if m:
+            if current:
+                results.append(current)
+            current = (int(m.group(1)), [m.group(2)])
+        elif current:
+            current[1].append(line)
+    if current:
+        results.append(current)
+
+    out = []
+    for tweet_id, lines in results:
+        text = " ".join(lines)
+        sentiment = "bearish" if _BEARISH_RE.search(text) else "bullish"
+        tickers = list(dict.fromkeys(t.upper() for t in _CASHTAG_RE.findall(text)))
+        out.append({"id": tweet_id, "calls": [{"ticker": t, "sentiment": sentiment} for t in tickers]})
+    return json.dumps({"results": out})
+
+
+def _support(messages: List[Dict[str, Any]]) -> str:
+    question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    return json.dumps({
+        "reply": f"Here's how to do that: open the menu in the top left and pick the page you need. ({question[:40]})",
+        "missing_feature": False,
+        "feature_request": {"title": "", "description": ""},
+    })
+
+
+def fake_completion(body: Dict[str, Any]) -> str:
+    messages = body.get("messages") or []
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    last = messages[-1].get("content") if messages else ""
+    if "Tweets:" in (last or ""):
+        return _classify(last)
+    if "support assistant" in system:
+        return _support(messages)
+    return "The user asked for help navigating Snipr and got directions."
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        server: "FakeOpenAIServer" = self.server
+        server.requests += 1
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        roll = random.random()
+        if roll < server.fail_rate:
+            self._send_json(500, {"error": {"message": "fake server error", "type": "server_error"}})
+            return
+        if roll < server.fail_rate + server.rate_limit_rate:
+            self._send_json(429, {"error": {"message": "fake rate limit", "type": "rate_limit"}}, {"Retry-After": "0.05"})
+            return
+
+        content = fake_completion(body)
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages") or []) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        for i in range(0, len(content), 8):
+            send({**base, "object": "chat.completion.chunk",
+                  "choices": [{"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}]})
+            if server.token_delay_ms:
+                time.sleep(server.token_delay_ms / 1000)
+        send({**base, "object": "chat.completion.chunk",
+              "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, token_delay_ms: float = 0,
+                 fail_rate: float = 0.0, rate_limit_rate: float = 0.0):
+        super().__init__((host, port), FakeOpenAIHandler)
+        self.latency_ms = latency_ms
+        self.token_delay_ms = token_delay_ms
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_fake_server(**kwargs) -> FakeOpenAIServer:
+    """Start a fake server on a background thread (port 0 picks a free port); see .base_url."""
+    server = FakeOpenAIServer(**kwargs)
+    threading.Thread(target=server.serve_forever, name="llm-fake-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--token-delay-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with a 429")
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.token_delay_ms, args.fail_rate, args.rate_limit_rate)
+    print(f"✅ Fake OpenAI server on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+import openai
+from openai import OpenAI
+
+from . import metrics
+
+# Point at a local stand-in (e.g. python -m src.lib.llm_fake_server) with OPENAI_BASE_URL
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+# Requests in flight at once across the whole process; the HTTP pool is sized to match
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Consecutive outage-type failures that open the breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+_LATENCY_WINDOW = 200
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the breaker is open."""
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(e, openai.APIStatusError) and e.status_code >= 500
+
+
+def _is_outage(e: Exception) -> bool:
+    # rate limits mean "slow down", not "down"; they don't trip the breaker
+    return _is_retryable(e) and not isinstance(e, openai.RateLimitError)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open
+    after `cooldown` seconds, letting one probe through; a probe success
+    closes it, a failure re-opens it. Every call that allow() let through
+    must end in record_success, record_failure or release_probe.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self._cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self._cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print("✅ LLM circuit breaker closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self._threshold):
+                self._opened_at = time.monotonic()
+                self.opens += 1
+                print(f"⚠️ LLM circuit breaker open for {self._cooldown:.0f}s after {self._failures} failures")
+            self._probing = False
+
+
+class LLMGateway:
+    """
+    The one OpenAI client for the process.
+
+    Holds a keep-alive HTTP connection pool, applies per-call timeouts,
+    retries 429/5xx/connection errors with jittered exponential backoff
+    (honouring Retry-After), fails fast with CircuitOpenError while the
+    breaker is open, and caps concurrent requests with a semaphore.
+    Per-purpose latency, token and error counts are kept for llm_stats().
+    """
+
+    def __init__(self):
+        self._client: Optional[OpenAI] = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=LLM_MAX_CONCURRENCY,
+                            max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                        ),
+                        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                    )
+                    # retries are ours (so they count toward the breaker and metrics)
+                    self._client = OpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        base_url=OPENAI_BASE_URL,
+                        http_client=http_client,
+                        max_retries=0,
+                    )
+        return self._client
+
+    def _purpose(self, purpose: str) -> Dict[str, Any]:
+        m = self._metrics.get(purpose)
+        if m is None:
+            m = self._metrics[purpose] = {
+                "calls": 0,
+                "errors": 0,
+                "retries": 0,
+                "rejected": 0,
+                "promptTokens": 0,
+                "completionTokens": 0,
+                "latencySecondsTotal": 0.0,
+                "latencies": deque(maxlen=_LATENCY_WINDOW),
+            }
+        return m
+
+    def _record(self, purpose: str, latency: Optional[float] = None, usage: Any = None, **counts: int) -> None:
+        with self._lock:
+            m = self._purpose(purpose)
+            for key, n in counts.items():
+                m[key] += n
+            if latency is not None:
+                m["calls"] += 1
+                m["latencySecondsTotal"] += latency
+                m["latencies"].append(latency)
+            if usage is not None:
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                m["promptTokens"] += prompt_tokens
+                m["completionTokens"] += completion_tokens
+        if latency is not None:
+            metrics.observe_stage(f"openai_{purpose}", latency)
+        if usage is not None:
+            metrics.llm_tokens.inc(prompt_tokens, purpose=purpose, kind="prompt")
+            metrics.llm_tokens.inc(completion_tokens, purpose=purpose, kind="completion")
+
+    def _create(self, purpose: str, timeout: Optional[float], **kwargs):
+        """chat.completions.create with breaker, retries and backoff. Caller holds a slot."""
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._record(purpose, rejected=1)
+                raise CircuitOpenError("LLM circuit breaker is open")
+            try:
+                resp = self.client.chat.completions.create(
+                    timeout=timeout or LLM_TIMEOUT_SECONDS, **kwargs
+                )
+                self.breaker.record_success()
+                return resp
+            except Exception as e:
+                if _is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    # a 429 or 4xx still answered (and a local error says nothing about it): the service is up
+                    self.breaker.record_success()
+                if not _is_retryable(e) or attempt >= LLM_MAX_RETRIES:
+                    self._record(purpose, errors=1)
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = LLM_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                self._record(purpose, retries=1)
+                print(f"🔄 LLM {purpose} call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+            except BaseException:
+                # interrupted mid-call: don't leave a half-open probe claimed forever
+                self.breaker.release_probe()
+                raise
+
+    def chat(self, purpose: str, timeout: Optional[float] = None, **kwargs):
+        """One chat completion. `purpose` labels the metrics (e.g. "classify", "support")."""
+        with self._slots:
+            t0 = time.monotonic()
+            resp = self._create(purpose, timeout, **kwargs)
+            self._record(purpose, latency=time.monotonic() - t0, usage=getattr(resp, "usage", None))
+            return resp
+
+    def stream_chat(self, purpose: str, timeout: Optional[float] = None, **kwargs) -> Iterator[Any]:
+        """
+        Streamed chat completion, yielding chunks. Only opening the stream is
+        retried; once chunks have been yielded an error propagates. The
+        concurrency slot is held until the stream is consumed or closed.
+        """
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        with self._slots:
+            t0 = time.monotonic()
+            stream = self._create(purpose, timeout, stream=True, **kwargs)
+            usage = None
+            try:
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    yield chunk
+            except Exception:
+                self._record(purpose, errors=1)
+                raise
+            finally:
+                stream.close()
+            self._record(purpose, latency=time.monotonic() - t0, usage=usage)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"breaker": self.breaker.state, "breakerOpens": self.breaker.opens}
+        with self._lock:
+            for purpose, m in self._metrics.items():
+                latencies = sorted(m["latencies"])
+                entry = {k: v for k, v in m.items() if k != "latencies"}
+                if latencies:
+                    entry["p50Ms"] = round(latencies[len(latencies) // 2] * 1000, 1)
+                    entry["p95Ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+                out[purpose] = entry
+        return out
+
+
+llm = LLMGateway()
+
+
+def llm_stats() -> Dict[str, Any]:
+    return llm.stats()
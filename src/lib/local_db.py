@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_DIR = os.getenv("SNIPR_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+
+
+class LocalDB:
+    """
+    A single SQLite connection shared across worker threads.
+
+    SQLite handles one writer at a time anyway, so a lock around the
+    connection is simpler and faster here than a connection per thread.
+    """
+
+    def __init__(self, filename: str, schema: str):
+        path = filename if os.path.isabs(filename) else os.path.join(CACHE_DIR, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(schema)
+            self.conn.commit()
+
+    def query(self, sql: str, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from . import metrics
+from .local_db import CACHE_DIR
+
+# Daily closes, one .npz per ticker: dates (datetime64[D]), close (float64) and the
+# date range Yahoo has returned bars for.
+PRICE_CACHE_DIR = os.getenv("PRICE_CACHE_DIR", os.path.join(CACHE_DIR, "prices"))
+# Today's bar keeps moving while the market is open; refetch it after this long
+PRICE_INTRADAY_TTL_SECONDS = int(os.getenv("PRICE_INTRADAY_TTL_SECONDS", "900"))
+# A download that returned no bars for a ticker (throttled, weekend-only range, delisted) is
+# not recorded as coverage; the ticker is just not re-asked for this long
+PRICE_EMPTY_RETRY_SECONDS = int(os.getenv("PRICE_EMPTY_RETRY_SECONDS", "300"))
+
+ONE_DAY = np.timedelta64(1, "D")
+
+_lock = threading.Lock()
+_memory: Dict[str, Dict[str, np.ndarray]] = {}
+# ticker -> monotonic time before which an empty download isn't retried
+_empty_until: Dict[str, float] = {}
+_stats = {"downloads": 0, "tickersDownloaded": 0, "cacheHits": 0, "cacheMisses": 0, "emptyResults": 0}
+
+
+def _path(ticker: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-._" else "_" for c in ticker)
+    return os.path.join(PRICE_CACHE_DIR, f"{safe}.npz")
+
+
+def _load(ticker: str) -> Optional[Dict[str, np.ndarray]]:
+    entry = _memory.get(ticker)
+    if entry is not None:
+        return entry
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as f:
+            entry = {k: f[k] for k in f.files}
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable price cache for {ticker}:", repr(e))
+        return None
+    _memory[ticker] = entry
+    return entry
+
+
+def _save(ticker: str, entry: Dict[str, np.ndarray]) -> None:
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    path = _path(ticker)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **entry)
+    os.replace(tmp, path)
+    _memory[ticker] = entry
+
+
+def _missing_range(entry, start: np.datetime64, end: np.datetime64, today: np.datetime64):
+    """The (lo, hi) range to fetch so the cache covers [start, end], or None if it already does."""
+    if entry is None:
+        return start, end
+    covered_from = entry["covered_from"][()]
+    covered_to = entry["covered_to"][()]
+    if covered_to >= today and time.time() - float(entry["fetched_at"][()]) > PRICE_INTRADAY_TTL_SECONDS:
+        covered_to = today - ONE_DAY
+
+    before = start < covered_from
+    after = end > covered_to
+    if before and after:
+        return start, end
+    if before:
+        return start, covered_from - ONE_DAY
+    if after:
+        return covered_to + ONE_DAY, end
+    return None
+
+
+def _download(tickers: List[str], start: np.datetime64, end: np.datetime64) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """One batched Yahoo request for every ticker over [start, end]."""
+    with metrics.timed("price_download"):
+        df = yf.download(
+            tickers=tickers,
+            start=str(start),
+            end=str(end + ONE_DAY),  # end is exclusive
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=True,
+            progress=False,
+            threads=True,
+        )
+    out = {}
+    if df is None or df.empty:
+        return out
+    for ticker in tickers:
+        try:
+            if isinstance(df.columns, pd.MultiIndex):
+                col = df[ticker]["Close"]
+            elif len(tickers) == 1:
+                col = df["Close"]
+            else:
+                continue
+        except KeyError:
+            continue
+        col = col.dropna()
+        dates = np.array([d.date() for d in col.index], dtype="datetime64[D]")
+        out[ticker] = (dates, col.to_numpy(dtype=np.float64))
+    return out
+
+
+def _merge(entry, dates: np.ndarray, close: np.ndarray, lo: np.datetime64, hi: np.datetime64) -> Dict[str, np.ndarray]:
+    if entry is None:
+        all_dates, all_close = dates, close
+        covered_from, covered_to = lo, hi
+    else:
+        # freshly downloaded bars win over cached ones for the same day
+        keep = (entry["dates"] < lo) | (entry["dates"] > hi)
+        all_dates = np.concatenate([entry["dates"][keep], dates])
+        all_close = np.concatenate([entry["close"][keep], close])
+        order = np.argsort(all_dates, kind="stable")
+        all_dates, all_close = all_dates[order], all_close[order]
+        covered_from = min(entry["covered_from"][()], lo)
+        covered_to = max(entry["covered_to"][()], hi)
+    return {
+        "dates": all_dates.astype("datetime64[D]"),
+        "close": all_close.astype(np.float64),
+        "covered_from": np.datetime64(covered_from, "D"),
+        "covered_to": np.datetime64(covered_to, "D"),
+        "fetched_at": np.float64(time.time()),
+    }
+
+
+def ensure_history(tickers: List[str], start, end) -> None:
+    """
+    Make sure daily closes for every ticker over [start, end] are cached, with at most one download.
+
+    The download runs outside the lock so cached lookups from other workers
+    aren't held up behind it. Tickers the download returned no bars for are
+    left uncovered (Yahoo answers a throttled request with an empty frame)
+    and retried after PRICE_EMPTY_RETRY_SECONDS.
+    """
+    today = np.datetime64("today", "D")
+    start = np.datetime64(start, "D")
+    end = min(np.datetime64(end, "D"), today)
+
+    with _lock:
+        now = time.monotonic()
+        missing = {}
+        for ticker in tickers:
+            rng = _missing_range(_load(ticker), start, end, today)
+            if rng is not None and _empty_until.get(ticker, 0) <= now:
+                missing[ticker] = rng
+        _stats["cacheHits"] += len(tickers) - len(missing)
+        _stats["cacheMisses"] += len(missing)
+    if not missing:
+        return
+
+    lo = min(r[0] for r in missing.values())
+    hi = max(r[1] for r in missing.values())
+    try:
+        fetched = _download(list(missing), lo, hi)
+    except Exception as e:
+        print("❌ Price download failed:", repr(e))
+        return
+
+    with _lock:
+        _stats["downloads"] += 1
+        _stats["tickersDownloaded"] += len(missing)
+        empty = [t for t in missing if not len(fetched.get(t, ((), ()))[0])]
+        retry_at = time.monotonic() + PRICE_EMPTY_RETRY_SECONDS
+        for ticker in missing:
+            if ticker in empty:
+                _empty_until[ticker] = retry_at
+                continue
+            _empty_until.pop(ticker, None)
+            dates, close = fetched[ticker]
+            _save(ticker, _merge(_load(ticker), dates, close, lo, hi))
+        _stats["emptyResults"] += len(empty)
+    print(f"✅ Downloaded prices for {len(missing) - len(empty)} tickers ({lo} → {hi})")
+    if empty:
+        print(f"⚠️ No price bars for {len(empty)} tickers, retrying after {PRICE_EMPTY_RETRY_SECONDS}s: {', '.join(empty[:10])}")
+
+
+def seed_history(ticker: str, dates: np.ndarray, close: np.ndarray) -> None:
+    """Cache a known series of daily closes as if it had just been downloaded (benchmarks, backfills)."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    close = np.asarray(close, dtype=np.float64)
+    with _lock:
+        _save(ticker, _merge(_load(ticker), dates, close, dates.min(), dates.max()))
+
+
+def close_matrix(tickers: List[str], start, end) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily closes for all tickers over [start, end].
+
+    Returns (dates, closes) where dates is the sorted union of trading days and
+    closes is a len(tickers) x len(dates) float array, NaN where a ticker has no bar.
+    """
+    ensure_history(tickers, start, end)
+    start = np.datetime64(start, "D")
+    end = np.datetime64(end, "D")
+
+    series = []
+    with _lock:
+        for ticker in tickers:
+            entry = _load(ticker)
+            if entry is None:
+                series.append((np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)))
+                continue
+            mask = (entry["dates"] >= start) & (entry["dates"] <= end)
+            series.append((entry["dates"][mask], entry["close"][mask]))
+
+    all_dates = np.unique(np.concatenate([d for d, _ in series])) if series else np.array([], dtype="datetime64[D]")
+    closes = np.full((len(tickers), len(all_dates)), np.nan)
+    for row, (dates, close) in enumerate(series):
+        if len(dates):
+            closes[row, np.searchsorted(all_dates, dates)] = close
+    return all_dates, closes
+
+
+def market_data_stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
@@ -1,72 +1,307 @@
+from dataclasses import dataclass, field
 from datetime import datetime
-from collections import deque
+from collections import deque, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import os
 import threading
+import time
 
-INACTIVITY_TIMERS = {}
 INACTIVITY_SECONDS = 30
 
-from .transcripts import upsert_conversation_file
-
-# In-memory store for conversations
-memory_store = {}
+from .timer_wheel import TimerWheel
+from .transcripts import forget_conversation, upsert_conversation_file
 
 # Maximum number of messages to keep per conversation
 MAX_MESSAGES = 50
 
-def get_or_create_convo(conversation_id, username):
+# Global caps; least recently used conversations are snapshotted and evicted past these
+MAX_CONVERSATIONS = int(os.getenv("MEMORY_STORE_MAX_CONVERSATIONS", "10000"))
+MAX_BYTES = int(os.getenv("MEMORY_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Conversations idle this long are snapshotted and dropped
+IDLE_TTL_SECONDS = int(os.getenv("MEMORY_STORE_IDLE_TTL_SECONDS", "1800"))
+
+# Rough per-message bookkeeping cost on top of the text itself
+_MESSAGE_OVERHEAD_BYTES = 200
+
+
+def _message_size(msg: Dict[str, Any]) -> int:
+    return len(msg.get("content") or "") + _MESSAGE_OVERHEAD_BYTES
+
+
+@dataclass(slots=True)
+class Conversation:
+    conversation_id: str
+    username: str
+    started_at: str
+    last_updated_at: str
+    messages: deque = field(default_factory=lambda: deque(maxlen=MAX_MESSAGES))
+    summary: str = ""
+    summarized_through: int = 0  # messages [0, summarized_through) are folded into summary
+    route_history: List[Dict[str, str]] = field(default_factory=list)
+    unknown_count: int = 0
+    feature_requested: bool = False
+    ended_at: Optional[str] = None
+    last_snapshot_at: Optional[str] = None
+    message_count: int = 0  # total ever appended; the deque only keeps the last MAX_MESSAGES
+    size_bytes: int = 0
+    last_access: float = 0.0
 
-    if conversation_id not in memory_store:
-        now = datetime.utcnow().isoformat()
-        memory_store[conversation_id] = {
-            "conversationId": conversation_id,  
-            "messages": deque(maxlen=MAX_MESSAGES),
-            "summary": "",
-            "routeHistory": [],
-            "startedAt": now,
-            "lastUpdatedAt": now,
-            "unknownCount": 0,
-            "endedAt": None,                    
-            "username": username,
+    def to_dict(self) -> Dict[str, Any]:
+        """The JSON shape written to chat_logs."""
+        return {
+            "conversationId": self.conversation_id,
+            "messages": list(self.messages),
+            "summary": self.summary,
+            "routeHistory": list(self.route_history),
+            "startedAt": self.started_at,
+            "lastUpdatedAt": self.last_updated_at,
+            "unknownCount": self.unknown_count,
+            "featureRequested": self.feature_requested,
+            "endedAt": self.ended_at,
+            "username": self.username,
+            "lastSnapshotAt": self.last_snapshot_at,
+            "messageCount": self.message_count,
         }
-    return memory_store[conversation_id]
 
 
-def append_message(conversation_id, role, content, route=None):
-    convo = memory_store.get(conversation_id)
-    if not convo:
-        raise ValueError(f"Conversation {conversation_id} does not exist.")
+class ConversationStore:
+    """
+    In-memory conversations shared by all Flask worker threads.
+
+    Every access goes through one lock. Conversations are kept in LRU order;
+    past MAX_CONVERSATIONS / MAX_BYTES, or after IDLE_TTL_SECONDS without
+    activity, they are snapshotted to chat_logs and evicted.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = MAX_CONVERSATIONS,
+        max_bytes: int = MAX_BYTES,
+        idle_ttl: int = IDLE_TTL_SECONDS,
+    ):
+        self._lock = threading.RLock()
+        self._convos: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._max_conversations = max_conversations
+        self._max_bytes = max_bytes
+        self._idle_ttl = idle_ttl
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evicted_lru = 0
+        self._evicted_idle = 0
+
+    def _touch(self, convo: Conversation) -> None:
+        convo.last_access = time.monotonic()
+        self._convos.move_to_end(convo.conversation_id)
+
+    def get_or_create(self, conversation_id: str, username: str) -> Conversation:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if convo:
+                self._hits += 1
+            else:
+                self._misses += 1
+                now = datetime.utcnow().isoformat()
+                convo = Conversation(
+                    conversation_id=conversation_id,
+                    username=username,
+                    started_at=now,
+                    last_updated_at=now,
+                )
+                self._convos[conversation_id] = convo
+            self._touch(convo)
+            evicted = self._collect_evictions_locked()
+        self._snapshot_evicted(evicted)
+        return convo
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            return self._convos.get(conversation_id)
 
-    ts = datetime.utcnow().isoformat()
+    def append(self, conversation_id: str, role: str, content: str, route: Optional[str] = None) -> str:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if not convo:
+                raise ValueError(f"Conversation {conversation_id} does not exist.")
 
-    convo["messages"].append({
-        "role": role,
-        "content": content,
-        "ts": ts,
-    })
+            ts = datetime.utcnow().isoformat()
+            msg = {"role": role, "content": content, "ts": ts}
+            if len(convo.messages) == convo.messages.maxlen:
+                dropped = _message_size(convo.messages[0])
+                convo.size_bytes -= dropped
+                self._bytes -= dropped
+            convo.messages.append(msg)
+            convo.message_count += 1
+            added = _message_size(msg)
+            convo.size_bytes += added
+            self._bytes += added
 
-    if route:
-        convo["routeHistory"].append({"route": route, "ts": ts})
+            if route:
+                convo.route_history.append({"route": route, "ts": ts})
+
+            convo.last_updated_at = ts
+            self._touch(convo)
+            evicted = self._collect_evictions_locked()
+        self._snapshot_evicted(evicted)
+        return ts
+
+    def recent_messages(self, conversation_id: str, limit: int = MAX_MESSAGES) -> List[Dict[str, Any]]:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            return list(convo.messages)[-limit:] if convo else []
+
+    def context_window(self, conversation_id: str) -> Dict[str, Any]:
+        """Summary state plus the in-memory messages, each tagged with its position in the conversation."""
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if not convo:
+                return {"summary": "", "summarizedThrough": 0, "messages": []}
+            first_seq = convo.message_count - len(convo.messages)
+            return {
+                "summary": convo.summary,
+                "summarizedThrough": convo.summarized_through,
+                "messages": [dict(m, seq=first_seq + i) for i, m in enumerate(convo.messages)],
+            }
+
+    def apply_summary(self, conversation_id: str, summary: str, through: int) -> bool:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if not convo or through <= convo.summarized_through:
+                return False
+            convo.summary = summary
+            convo.summarized_through = through
+            return True
+
+    def increment_unknown(self, conversation_id: str) -> int:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if not convo:
+                return 0
+            convo.unknown_count += 1
+            return convo.unknown_count
+
+    def mark_feature_requested(self, conversation_id: str) -> None:
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if convo:
+                convo.feature_requested = True
+
+    def snapshot_if_idle(self, conversation_id: str, scheduled_last_updated_at: str) -> Optional[Dict[str, Any]]:
+        """Mark and return a snapshot dict if nothing changed since the timer was scheduled."""
+        with self._lock:
+            convo = self._convos.get(conversation_id)
+            if not convo:
+                return None
+            if convo.last_updated_at != scheduled_last_updated_at:
+                return None
+            if convo.last_snapshot_at == scheduled_last_updated_at:
+                return None
+            convo.last_snapshot_at = scheduled_last_updated_at
+            return convo.to_dict()
+
+    def pop(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            convo = self._convos.pop(conversation_id, None)
+            if not convo:
+                return None
+            self._bytes -= convo.size_bytes
+            return convo.to_dict()
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            evicted = self._collect_evictions_locked()
+        self._snapshot_evicted(evicted)
+        return len(evicted)
+
+    def _collect_evictions_locked(self) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        evicted = []
+        # LRU order is also idle order, so expired conversations sit at the front
+        cutoff = time.monotonic() - self._idle_ttl
+        while self._convos:
+            oldest = next(iter(self._convos.values()))
+            if oldest.last_access < cutoff:
+                self._evicted_idle += 1
+            elif len(self._convos) > self._max_conversations or self._bytes > self._max_bytes:
+                self._evicted_lru += 1
+            else:
+                break
+            self._convos.popitem(last=False)
+            self._bytes -= oldest.size_bytes
+            _cancel_timers(oldest.conversation_id)
+            # (conversationId, dict to snapshot or None when the last snapshot is still current)
+            needs_write = oldest.messages and oldest.last_snapshot_at != oldest.last_updated_at
+            evicted.append((oldest.conversation_id, oldest.to_dict() if needs_write else None))
+        return evicted
+
+    def _snapshot_evicted(self, evicted: List[Tuple[str, Optional[Dict[str, Any]]]]) -> None:
+        for conversation_id, convo in evicted:
+            if convo is None:
+                forget_conversation(conversation_id)
+                continue
+            convo["snapshotAt"] = datetime.utcnow().isoformat()
+            convo["isSnapshot"] = True
+            try:
+                upsert_conversation_file(convo, is_final=False, evicted=True)
+                print(f"✅ Snapshot saved for evicted convo={conversation_id}")
+            except Exception as e:
+                print(f"❌ Snapshot failed for evicted convo={conversation_id}:", repr(e))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "conversations": len(self._convos),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictedLru": self._evicted_lru,
+                "evictedIdle": self._evicted_idle,
+            }
+
+
+# In-memory store for conversations
+store = ConversationStore()
 
-    convo["lastUpdatedAt"] = ts
 
+def get_or_create_convo(conversation_id, username):
+    return store.get_or_create(conversation_id, username)
+
+
+def append_message(conversation_id, role, content, route=None):
+    store.append(conversation_id, role, content, route=route)
     reset_inactivity_timer(conversation_id)
 
 
-def _snapshot_if_still_idle(conversation_id: str, scheduled_last_updated_at: str):
-    convo = memory_store.get(conversation_id)
-    if not convo:
-        return
+def get_recent_messages(conversation_id, limit=MAX_MESSAGES):
+    return store.recent_messages(conversation_id, limit)
 
-    if convo.get("lastUpdatedAt") != scheduled_last_updated_at:
-        return
 
-    if convo.get("lastSnapshotAt") == scheduled_last_updated_at:
-        return
+def get_context_window(conversation_id):
+    return store.context_window(conversation_id)
+
+
+def apply_summary(conversation_id, summary, through):
+    return store.apply_summary(conversation_id, summary, through)
+
+
+def increment_unknown_count(conversation_id):
+    return store.increment_unknown(conversation_id)
+
+
+def mark_feature_requested(conversation_id):
+    store.mark_feature_requested(conversation_id)
 
-    convo["lastSnapshotAt"] = scheduled_last_updated_at
 
-    safe_convo = dict(convo)
-    safe_convo["messages"] = list(convo.get("messages", []))  # deque -> list
+def memory_store_stats():
+    return store.stats()
+
+
+def _snapshot_if_still_idle(conversation_id: str, scheduled_last_updated_at: str):
+    safe_convo = store.snapshot_if_idle(conversation_id, scheduled_last_updated_at)
+    if not safe_convo:
+        return
+
     safe_convo["snapshotAt"] = datetime.utcnow().isoformat()
     safe_convo["isSnapshot"] = True
 
@@ -74,29 +309,40 @@ def _snapshot_if_still_idle(conversation_id: str, scheduled_last_updated_at: str
     print(f"✅ Snapshot saved for convo={conversation_id}")
 
 
-def reset_inactivity_timer(conversation_id: str):
-    timer = INACTIVITY_TIMERS.get(conversation_id)
-    if timer:
-        timer.cancel()
+def _on_timers_due(due):
+    """Timer wheel callback: one batch of snapshot/expiry deadlines that came due this tick."""
+    expired = False
+    for (kind, conversation_id), payload in due:
+        if kind == "snapshot":
+            try:
+                _snapshot_if_still_idle(conversation_id, payload)
+            except Exception as e:
+                print(f"❌ Snapshot failed for convo={conversation_id}:", repr(e))
+        elif kind == "expire":
+            expired = True
+    if expired:
+        store.evict_idle()
 
-    convo = memory_store.get(conversation_id)
-    if not convo:
-        return
 
-    scheduled_last = convo.get("lastUpdatedAt")
+# One scheduler thread for every conversation's inactivity deadlines
+_timers = TimerWheel(_on_timers_due, tick_seconds=0.5, name="convo-timers")
+
+
+def _cancel_timers(conversation_id: str):
+    _timers.cancel(("snapshot", conversation_id))
+    _timers.cancel(("expire", conversation_id))
+
 
-    timer = threading.Timer(
-        INACTIVITY_SECONDS,
-        _snapshot_if_still_idle,
-        args=[conversation_id, scheduled_last],
-    )
+def reset_inactivity_timer(conversation_id: str):
+    convo = store.get(conversation_id)
+    if not convo:
+        return
 
-    INACTIVITY_TIMERS[conversation_id] = timer
-    timer.start()
+    # rescheduling an existing key just moves it; no thread churn per message
+    _timers.schedule(("snapshot", conversation_id), INACTIVITY_SECONDS, convo.last_updated_at)
+    _timers.schedule(("expire", conversation_id), IDLE_TTL_SECONDS + 1)
 
 
 def end_convo(conversation_id):
-    timer = INACTIVITY_TIMERS.pop(conversation_id, None)
-    if timer:
-        timer.cancel()
-    return memory_store.pop(conversation_id, None)
\ No newline at end of file
+    _cancel_timers(conversation_id)
+    return store.pop(conversation_id)
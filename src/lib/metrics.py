@@ -0,0 +1,186 @@
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers a cached lookup (ms) up to a cold Chrome scrape (tens of seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# --- the app's metrics -------------------------------------------------------
+
+stage_seconds = Histogram(
+    "snipr_stage_seconds", "Time spent in one stage of a request or background job.", ["stage"]
+)
+http_request_seconds = Histogram(
+    "snipr_http_request_seconds", "HTTP request latency by endpoint.", ["endpoint", "method", "status"]
+)
+support_ttft_seconds = Histogram(
+    "snipr_support_ttft_seconds", "Time to first streamed support reply token.", []
+)
+tweets_scraped = Counter("snipr_tweets_scraped_total", "Tweets returned to the analyze pipeline.", ["source"])
+llm_tokens = Counter("snipr_llm_tokens_total", "OpenAI tokens used.", ["purpose", "kind"])
+
+_REGISTRY = [stage_seconds, http_request_seconds, support_ttft_seconds, tweets_scraped, llm_tokens]
+# component -> fn returning a (possibly nested) dict of numbers, exported as gauges;
+# this is where the caches' hit/miss counts and queue depths come from
+_COLLECTORS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_COLLECTORS_LOCK = threading.Lock()
+
+# per-thread list of (stage, seconds) for the Server-Timing header / job timings
+_local = threading.local()
+
+
+def start_timings() -> None:
+    _local.timings = []
+
+
+def pop_timings() -> List[Tuple[str, float]]:
+    timings = getattr(_local, "timings", None) or []
+    _local.timings = None
+    return timings
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    stage_seconds.observe(seconds, stage=stage)
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block into snipr_stage_seconds{stage=...} (and this thread's timings, if collecting)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - t0)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Server-Timing value, e.g. 'auth_verify;dur=2.1, user_lookup;dur=14.0, total;dur=18.3'."""
+    merged: Dict[str, float] = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def register_collector(component: str, fn: Callable[[], Dict[str, Any]]) -> None:
+    """Export the numeric values of fn() as snipr_<component>_<key> gauges on every scrape."""
+    with _COLLECTORS_LOCK:
+        _COLLECTORS[component] = fn
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name)).lower()
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]) -> None:
+    if isinstance(value, bool):
+        out[prefix] = float(value)
+    elif isinstance(value, (int, float)):
+        out[prefix] = float(value)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}_{_snake(str(k))}", v, out)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines += metric.render()
+    with _COLLECTORS_LOCK:
+        collectors = list(_COLLECTORS.items())
+    for component, fn in collectors:
+        try:
+            values: Dict[str, float] = {}
+            _flatten(f"snipr_{_snake(component)}", fn(), values)
+        except Exception as e:
+            print(f"⚠️ Metrics collector {component} failed:", repr(e))
+            continue
+        for name, value in sorted(values.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
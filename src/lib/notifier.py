@@ -1,8 +1,11 @@
+import atexit
 import os
+import random
 import smtplib
+import threading
+import time
+from collections import OrderedDict
 from email.message import EmailMessage
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import logging
 
 # Configure logging
@@ -17,60 +20,221 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 
+# Requests are collected for this long and sent as one digest email
+NOTIFY_DIGEST_SECONDS = float(os.getenv("NOTIFY_DIGEST_SECONDS", "60"))
+# The same conversation asking for the same feature again within this window is not re-sent
+NOTIFY_DEDUPE_SECONDS = float(os.getenv("NOTIFY_DEDUPE_SECONDS", str(24 * 3600)))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "2"))
+_DEDUPE_MAX_KEYS = 10000
 
-def send_feature_request_email(
-    username: str,
-    route: str,
-    user_message: str,
-    title: str | None,
-    description: str | None,
-    timestamp: str,
-    conversation_id: str,
-):
-    to_email = os.getenv("SUPPORT_NOTIFY_EMAIL_TO")
-    from_email = os.getenv("SUPPORT_NOTIFY_EMAIL_FROM")
-
-    # ✅ Don't crash the server if not configured (especially in dev)
-    if not to_email or not from_email:
-        print("⚠️ Email notifier not configured (missing SUPPORT_NOTIFY_EMAIL_TO/FROM). Skipping email.")
-        return
 
-    # SMTP config (optional)
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
+def _smtp_config():
+    # read at send time so load_dotenv() in app.py has already run
+    return {
+        "to": os.getenv("SUPPORT_NOTIFY_EMAIL_TO"),
+        "from": os.getenv("SUPPORT_NOTIFY_EMAIL_FROM"),
+        "host": os.getenv("SMTP_HOST"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": os.getenv("SMTP_USER"),
+        "password": os.getenv("SMTP_PASS"),
+        # set SMTP_STARTTLS=0 for a local plaintext stand-in (python -m aiosmtpd -n -l localhost:1025)
+        "starttls": os.getenv("SMTP_STARTTLS", "1") != "0",
+    }
 
-    if not smtp_host or not smtp_user or not smtp_pass:
-        print("⚠️ SMTP not configured (missing SMTP_HOST/SMTP_USER/SMTP_PASS). Skipping email.")
-        return
 
-    subject = f"Snipr Feature Request: {title or 'New request'}"
+def _format_request(r) -> str:
+    return f"""
+Username: {r['username']}
+Route: {r['route']}
+Message: {r['user_message']}
+Timestamp: {r['timestamp']}
+Conversation ID: {r['conversation_id']}
 
-    body = f"""
-A user asked for a feature that may not exist.
+Title: {r['title'] or ''}
+Description: {r['description'] or ''}
+""".strip()
 
-Username: {username}
-Route: {route}
-Message: {user_message}
-Timestamp: {timestamp}
-Conversation ID: {conversation_id}
 
-Title: {title or ''}
-Description: {description or ''}
-""".strip()
+def _build_message(requests, config) -> EmailMessage:
+    if len(requests) == 1:
+        subject = f"Snipr Feature Request: {requests[0]['title'] or 'New request'}"
+        body = "A user asked for a feature that may not exist.\n\n" + _format_request(requests[0])
+    else:
+        subject = f"Snipr Feature Requests: {len(requests)} new"
+        body = f"{len(requests)} users asked for features that may not exist.\n\n" + "\n\n----------\n\n".join(
+            f"[{i}] {r['title'] or 'New request'}\n{_format_request(r)}" for i, r in enumerate(requests, 1)
+        )
 
     msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = from_email
-    msg["To"] = to_email
+    msg["From"] = config["from"]
+    msg["To"] = config["to"]
     msg.set_content(body)
+    return msg
+
+
+class FeatureRequestNotifier:
+    """
+    Sends feature-request emails from a background thread.
+
+    Requests are queued by the chat endpoint and sent every
+    NOTIFY_DIGEST_SECONDS as one digest email over a single SMTP connection
+    that is kept open (and logged into once) between digests. Repeats from
+    the same conversation with the same title are dropped. Failed sends are
+    retried with jittered exponential backoff on a fresh connection.
+    """
+
+    def __init__(self, interval: float = NOTIFY_DIGEST_SECONDS):
+        self._interval = interval
+        self._cond = threading.Condition()
+        self._pending = []
+        self._flush_requested = False
+        self._sending = False
+        # (conversation_id, title) -> time first queued
+        self._seen: "OrderedDict[tuple, float]" = OrderedDict()
+        self._smtp = None
+        self._stats = {"queued": 0, "duplicates": 0, "emails": 0, "requestsSent": 0, "retries": 0, "failed": 0, "connections": 0}
+        self._thread = threading.Thread(target=self._run, name="feature-request-notifier", daemon=True)
+        self._thread.start()
+
+    def submit(self, request) -> bool:
+        """Queue one request. Returns False if it was a duplicate."""
+        key = (request["conversation_id"], (request["title"] or "").strip().lower())
+        now = time.monotonic()
+        with self._cond:
+            while self._seen and next(iter(self._seen.values())) < now - NOTIFY_DEDUPE_SECONDS:
+                self._seen.popitem(last=False)
+            if key in self._seen:
+                self._stats["duplicates"] += 1
+                return False
+            self._seen[key] = now
+            if len(self._seen) > _DEDUPE_MAX_KEYS:
+                self._seen.popitem(last=False)
+            self._pending.append(request)
+            self._stats["queued"] += 1
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Send whatever is queued now instead of waiting for the digest interval."""
+        with self._cond:
+            if self._pending:
+                self._flush_requested = True
+                self._cond.notify()
+            return self._cond.wait_for(lambda: not self._pending and not self._sending, timeout=timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                # give the digest window time to fill up
+                deadline = time.monotonic() + self._interval
+                while not self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                self._sending = True
+            try:
+                self._send_with_retry(batch)
+            finally:
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
 
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
+    def _connection(self, config):
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close()
+
+        server = smtplib.SMTP(config["host"], config["port"], timeout=30)
+        if config["starttls"]:
             server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.send_message(msg)
-        print("✅ Feature request email sent.")
-    except Exception as e:
-        print("❌ Failed to send feature request email:", repr(e))
\ No newline at end of file
+        if config["user"] and config["password"]:
+            server.login(config["user"], config["password"])
+        self._smtp = server
+        with self._cond:
+            self._stats["connections"] += 1
+        return server
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _send_with_retry(self, batch):
+        config = _smtp_config()
+        # ✅ Don't crash the server if not configured (especially in dev)
+        if not config["to"] or not config["from"]:
+            print("⚠️ Email notifier not configured (missing SUPPORT_NOTIFY_EMAIL_TO/FROM). Skipping email.")
+            return
+        if not config["host"]:
+            print("⚠️ SMTP not configured (missing SMTP_HOST). Skipping email.")
+            return
+
+        msg = _build_message(batch, config)
+        for attempt in range(NOTIFY_MAX_RETRIES + 1):
+            try:
+                self._connection(config).send_message(msg)
+                with self._cond:
+                    self._stats["emails"] += 1
+                    self._stats["requestsSent"] += len(batch)
+                print(f"✅ Feature request email sent ({len(batch)} request{'s' if len(batch) != 1 else ''}).")
+                return
+            except Exception as e:
+                self._close()
+                if attempt == NOTIFY_MAX_RETRIES:
+                    with self._cond:
+                        self._stats["failed"] += len(batch)
+                    print("❌ Failed to send feature request email:", repr(e))
+                    return
+                delay = NOTIFY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+                with self._cond:
+                    self._stats["retries"] += 1
+                print(f"🔄 Feature request email failed ({e!r}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+notifier = FeatureRequestNotifier()
+atexit.register(notifier.flush)
+
+
+def send_feature_request_email(
+    username: str,
+    route: str,
+    user_message: str,
+    title: str | None,
+    description: str | None,
+    timestamp: str,
+    conversation_id: str,
+):
+    """Queue a feature-request notification; it goes out with the next digest."""
+    notifier.submit({
+        "username": username,
+        "route": route,
+        "user_message": user_message,
+        "title": title,
+        "description": description,
+        "timestamp": timestamp,
+        "conversation_id": conversation_id,
+    })
+
+
+def notifier_stats():
+    return notifier.stats()
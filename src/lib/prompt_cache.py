@@ -0,0 +1,47 @@
+import threading
+from typing import Callable, Dict, Tuple
+
+from .context_builder import count_tokens
+from .knowledge_index import knowledge_index
+from .knowledge_loader import knowledge_signature, knowledge_version
+
+
+class PromptCache:
+    """
+    Holds the assembled support system prompt and its token count.
+
+    The prompt only depends on the knowledge base, so it is rebuilt when
+    knowledge_version() changes (checked via the rate-limited mtime scan in
+    knowledge_loader) and otherwise returned as the same string every time.
+    Keeping it byte-identical across requests lets the provider's prompt
+    prefix cache apply.
+    """
+
+    def __init__(self, builder: Callable[[], str]):
+        self._builder = builder
+        self._lock = threading.Lock()
+        # (knowledge version, prompt, token count)
+        self._entry: Tuple[str, str, int] = ("", "", 0)
+        self._rebuilds = 0
+        self._hits = 0
+
+    def get(self) -> Tuple[str, int]:
+        version = knowledge_version()
+        entry = self._entry
+        if entry[0] == version:
+            self._hits += 1
+            return entry[1], entry[2]
+
+        with self._lock:
+            if self._entry[0] != version:
+                knowledge_index.refresh(knowledge_signature())
+                prompt = self._builder()
+                # single assignment: concurrent readers see the old or the new prompt, never a mix
+                self._entry = (version, prompt, count_tokens(prompt))
+                self._rebuilds += 1
+                print(f"✅ Support system prompt built: {self._entry[2]} tokens (knowledge {version})")
+            return self._entry[1], self._entry[2]
+
+    def stats(self) -> Dict[str, object]:
+        version, _, tokens = self._entry
+        return {"knowledgeVersion": version, "promptTokens": tokens, "rebuilds": self._rebuilds, "hits": self._hits}
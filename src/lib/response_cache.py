@@ -0,0 +1,33 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from .knowledge_index import tokenize
+from .knowledge_loader import knowledge_version
+from .lru_cache import LRUCache
+
+SUPPORT_CACHE_MAX_ENTRIES = int(os.getenv("SUPPORT_CACHE_MAX_ENTRIES", "1000"))
+SUPPORT_CACHE_TTL_SECONDS = float(os.getenv("SUPPORT_CACHE_TTL_SECONDS", "3600"))
+
+
+def normalize_question(message: str) -> str:
+    """
+    Reduce a question to its content words so near-identical phrasings share a key:
+    "Where do I see my snipes?" and "where can i see my snipe" both become "see snipe".
+    """
+    return " ".join(sorted(set(tokenize(message))))
+
+
+def support_cache_key(message: str, route: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """(question, route, knowledge version), or None if the message has no content words."""
+    question = normalize_question(message)
+    if not question:
+        return None
+    return question, (route or "").rstrip("/") or "/", knowledge_version()
+
+
+# Answers to opening support questions
+support_cache = LRUCache(SUPPORT_CACHE_MAX_ENTRIES, ttl=SUPPORT_CACHE_TTL_SECONDS)
+
+
+def support_cache_stats() -> Dict[str, Any]:
+    return support_cache.stats()
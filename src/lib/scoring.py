@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from . import market_data
+
+# Forward-return horizons in calendar days
+HORIZONS = {"1d": 1, "1w": 7, "1m": 30}
+# Horizon behind the headline reliability score and the per-ticker breakdown
+PRIMARY_HORIZON = "1w"
+
+
+def call_day(ts: Optional[str]) -> Optional[np.datetime64]:
+    """The day a call was made, or None if its timestamp is missing or unparseable."""
+    if not ts or not isinstance(ts, str):
+        return None
+    try:
+        return np.datetime64(ts[:10], "D")
+    except ValueError:
+        return None
+
+
+def _call_days(timestamps: List[Optional[str]]) -> np.ndarray:
+    # NaT for undated calls; they are never scored
+    days = [call_day(ts) for ts in timestamps]
+    return np.array([np.datetime64("NaT", "D") if d is None else d for d in days], dtype="datetime64[D]")
+
+
+def price_window(timestamps: List[Optional[str]]):
+    """(start, today) of the daily closes needed to score calls made at these timestamps."""
+    today = np.datetime64("today", "D")
+    call_days = _call_days(list(timestamps))
+    call_days = call_days[~np.isnat(call_days)]
+    # room to find an entry bar before the earliest call
+    start = (call_days.min() if len(call_days) else today) - np.timedelta64(7, "D")
+    return start, today
+
+
+def _forward_fill(closes: np.ndarray) -> np.ndarray:
+    """Carry each row's last close forward over days it has no bar (NaN before its first bar)."""
+    if closes.size == 0:
+        return closes
+    cols = np.arange(closes.shape[1])
+    idx = np.where(~np.isnan(closes), cols, 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return closes[np.arange(closes.shape[0])[:, None], idx]
+
+
+def score_calls(tickers, sentiments, timestamps, horizons: Dict[str, int] = HORIZONS) -> Dict[str, Any]:
+    """
+    Forward returns for a set of calls, vectorized across calls and horizons.
+
+    tickers / sentiments / timestamps are parallel sequences, one entry per call
+    (timestamps are ISO strings or None). The entry price is the last close on or
+    before the call day; the exit price is the first close on or after
+    call day + horizon, so a 1d call made on a Friday exits on Monday. A horizon
+    that hasn't fully elapsed, or has but has no bar on or after its target yet,
+    is marked to the latest close and flagged as not matured. Calls with no
+    price move yet (no bar after the entry) are unresolved, and so are calls
+    without a valid timestamp: there is no date to score them from.
+
+    Returns per-call arrays ("returns", "correct", "resolved", "matured", each
+    keyed by horizon) and per-horizon aggregates.
+    """
+    tickers = np.asarray(tickers, dtype=object)
+    bullish = np.asarray(sentiments, dtype=object) == "bullish"
+    today = np.datetime64("today", "D")
+    call_days = _call_days(list(timestamps))
+    dated = ~np.isnat(call_days)
+    n = len(tickers)
+
+    out: Dict[str, Any] = {"returns": {}, "correct": {}, "resolved": {}, "matured": {}, "aggregate": {}}
+    if not dated.any():
+        for h in horizons:
+            out["returns"][h] = np.full(n, np.nan)
+            for key in ("correct", "resolved", "matured"):
+                out[key][h] = np.zeros(n, dtype=bool)
+            out["aggregate"][h] = {"correct": 0, "total": 0, "matured": 0, "reliability": 0}
+        return out
+
+    uniq, inv = np.unique(tickers.astype(str), return_inverse=True)
+    start, _ = price_window(list(timestamps))
+    dates, closes = market_data.close_matrix(list(uniq), start, today)
+    filled = _forward_fill(closes)
+
+    if len(dates) == 0:
+        entry_px = np.full(n, np.nan)
+        entry_pos = np.full(n, -1)
+    else:
+        entry_pos = np.where(dated, np.searchsorted(dates, call_days, side="right") - 1, -1)
+        entry_px = np.where(entry_pos >= 0, filled[inv, np.clip(entry_pos, 0, None)], np.nan)
+
+    for h, days in horizons.items():
+        target = call_days + np.timedelta64(days, "D")
+        matured = dated & (target <= today)
+        if len(dates) == 0:
+            ret = np.full(n, np.nan)
+        else:
+            first_after = np.searchsorted(dates, target, side="left")
+            matured = matured & (first_after < len(dates))
+            last_before = np.searchsorted(dates, target, side="right") - 1
+            exit_pos = np.where(matured, first_after, last_before)
+            exit_px = filled[inv, np.clip(exit_pos, 0, None)]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ret = np.where(dated & (exit_pos > entry_pos), exit_px / entry_px - 1.0, np.nan)
+
+        resolved = ~np.isnan(ret)
+        correct = resolved & np.where(bullish, ret > 0, ret < 0)
+        total = int(resolved.sum())
+        n_correct = int(correct.sum())
+
+        out["returns"][h] = ret
+        out["correct"][h] = correct
+        out["resolved"][h] = resolved
+        out["matured"][h] = matured & resolved
+        out["aggregate"][h] = {
+            "correct": n_correct,
+            "total": total,
+            "matured": int((matured & resolved).sum()),
+            "reliability": round(n_correct / total * 100) if total else 0,
+        }
+    return out
+
+
+# Compare predictions with stock performance
+def fact_check(calls, details: Optional[Dict[str, Any]] = None):
+    """
+    Score calls at the primary horizon.
+
+    `calls` is a list of {"ticker", "sentiment", "postedAt"} dicts (or a plain
+    {ticker: sentiment} dict, whose calls are undated and so unscored), newest first. Returns
+    (correct, total, breakdown) where total counts calls with a price move and
+    breakdown maps each ticker to whether its most recent resolved call was
+    right (None if none resolved). If `details` is given it gets the per-horizon
+    aggregates under "horizons" and the raw score_calls output under "scored".
+    """
+    if isinstance(calls, dict):
+        calls = [{"ticker": t, "sentiment": s, "postedAt": None} for t, s in calls.items()]
+
+    scored = score_calls(
+        [c["ticker"] for c in calls],
+        [c["sentiment"] for c in calls],
+        [c.get("postedAt") for c in calls],
+    )
+    if details is not None:
+        details["horizons"] = scored["aggregate"]
+        # per-call arrays, for folding matured calls into running stats
+        details["scored"] = scored
+
+    breakdown: Dict[str, Optional[bool]] = {c["ticker"]: None for c in calls}
+    if calls:
+        resolved = scored["resolved"][PRIMARY_HORIZON]
+        correct = scored["correct"][PRIMARY_HORIZON]
+        # calls are newest first, so the first resolved call per ticker is the latest one
+        for i in np.flatnonzero(resolved):
+            ticker = calls[i]["ticker"]
+            if breakdown[ticker] is None:
+                breakdown[ticker] = bool(correct[i])
+
+    agg = scored["aggregate"][PRIMARY_HORIZON]
+    return agg["correct"], agg["total"], breakdown
@@ -0,0 +1,192 @@
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from . import metrics, tweet_cache
+from .browser_pool import browser_pool
+
+# How long to wait for the timeline to render something new before counting a round as stuck
+INITIAL_WAIT_SECONDS = float(os.getenv("SCRAPE_INITIAL_WAIT_SECONDS", "10"))
+SCROLL_WAIT_SECONDS = float(os.getenv("SCRAPE_SCROLL_WAIT_SECONDS", "2.5"))
+# Point at a local stand-in timeline (e.g. python -m src.lib.timeline_fake_server) for benchmarks
+X_BASE_URL = os.getenv("SNIPR_X_BASE_URL", "https://x.com").rstrip("/")
+
+# Returns [text, postedAt] for every tweet block not handed back yet and marks it as seen,
+# so each round only pays for newly rendered nodes in a single round-trip.
+_COLLECT_NEW_JS = """
+const out = [];
+for (const el of document.querySelectorAll('article div[lang]:not([data-snipr-seen])')) {
+  el.setAttribute('data-snipr-seen', '1');
+  const txt = (el.innerText || '').trim();
+  const time = el.closest('article')?.querySelector('time[datetime]');
+  if (txt) out.push([txt, time ? time.getAttribute('datetime') : null]);
+}
+return out;
+"""
+
+# Optionally scrolls, then resolves as soon as an unseen tweet block shows up
+# (MutationObserver) or the timeout passes. Resolves true if something new rendered.
+_WAIT_FOR_NEW_JS = """
+const [timeoutMs, scroll, done] = arguments;
+const selector = 'article div[lang]:not([data-snipr-seen])';
+if (document.querySelector(selector)) { done(true); return; }
+let timer = null;
+const observer = new MutationObserver(() => {
+  if (document.querySelector(selector)) {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(true);
+  }
+});
+observer.observe(document.body, { childList: true, subtree: true });
+timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+if (scroll) window.scrollTo(0, document.body.scrollHeight);
+"""
+
+
+def _wait_for_new(driver, timeout: float, scroll: bool) -> bool:
+    driver.set_script_timeout(timeout + 5)
+    return bool(driver.execute_async_script(_WAIT_FOR_NEW_JS, int(timeout * 1000), scroll))
+
+
+# Scrape tweets using a pooled Selenium session
+def get_tweets(
+    twitter_username: str,
+    limit: int = 100,
+    stats: Optional[Dict[str, Any]] = None,
+    known_hashes: Optional[Set[str]] = None,
+):
+    """
+    Scrape up to `limit` tweets from a profile timeline, newest first, as
+    {"text", "postedAt"} dicts (postedAt is X's ISO timestamp, or None).
+
+    If `known_hashes` is given (see tweet_cache.tweet_hash), scrolling stops at
+    the first round where every new tweet is already known, and only the
+    tweets above that point are returned.
+
+    If `stats` is given it is filled with timing info: page load time and one
+    entry per scroll round (wait for DOM change, extraction time, new tweets).
+    """
+    t_start = time.monotonic()
+    rounds: List[Dict[str, Any]] = []
+
+    with browser_pool.driver() as driver:
+        # go straight to profile (no login)
+        url = f"{X_BASE_URL}/{twitter_username}"
+        print(f"➡️ Navigating to: {url}")
+        with metrics.timed("scrape_page_load"):
+            driver.get(url)
+            loaded = _wait_for_new(driver, INITIAL_WAIT_SECONDS, scroll=False)
+        t_loaded = time.monotonic()
+        load_ms = (t_loaded - t_start) * 1000
+        if not loaded:
+            print("⚠️ Timeline did not render any tweets before timeout")
+
+        # If X shows a login wall, you’ll often still get some tweets.
+        # We scrape what we can. If we get almost nothing, we’ll return [].
+        tweets = []
+        seen = set()
+        reached_known = False
+
+        scroll_attempts = 40
+        stuck_rounds = 0
+        max_stuck_rounds = 4
+        wait_ms = 0.0
+        for attempt in range(scroll_attempts):
+            # Grab only tweet blocks rendered since the last round
+            t0 = time.monotonic()
+            new_count = 0
+            known_count = 0
+            for txt, posted_at in driver.execute_script(_COLLECT_NEW_JS) or []:
+                if txt in seen:
+                    continue
+                seen.add(txt)
+                if known_hashes and tweet_cache.tweet_hash(txt) in known_hashes:
+                    known_count += 1
+                    continue
+                tweets.append({"text": txt, "postedAt": posted_at})
+                new_count += 1
+                if len(tweets) >= limit:
+                    break
+            extract_ms = (time.monotonic() - t0) * 1000
+
+            rounds.append({
+                "round": attempt + 1,
+                "waitMs": round(wait_ms, 1),
+                "extractMs": round(extract_ms, 1),
+                "new": new_count,
+                "known": known_count,
+                "total": len(tweets),
+            })
+            print(
+                f"🔄 Scroll attempt {attempt + 1} | +{new_count} new | total={len(tweets)}"
+                f" | wait={wait_ms:.0f}ms extract={extract_ms:.0f}ms"
+            )
+            if len(tweets) >= limit:
+                break
+            if known_count and not new_count:
+                # everything below this point is already cached
+                reached_known = True
+                print("✅ Reached previously cached tweets, stopping.")
+                break
+
+            # if we didn't find new tweets this round, count as "stuck"
+            if new_count == 0:
+                stuck_rounds += 1
+                if stuck_rounds >= max_stuck_rounds:
+                    print("⚠️ No new tweets after multiple scrolls, stopping.")
+                    break
+            else:
+                stuck_rounds = 0
+
+            # scroll and wait for the timeline to grow instead of sleeping a fixed interval
+            t0 = time.monotonic()
+            _wait_for_new(driver, SCROLL_WAIT_SECONDS, scroll=True)
+            wait_ms = (time.monotonic() - t0) * 1000
+
+        metrics.observe_stage("scrape_scroll", time.monotonic() - t_loaded)
+
+    total_ms = (time.monotonic() - t_start) * 1000
+    if stats is not None:
+        stats["loadMs"] = round(load_ms, 1)
+        stats["totalMs"] = round(total_ms, 1)
+        stats["rounds"] = rounds
+        stats["reachedCached"] = reached_known
+    print(f"✅ Fetched {len(tweets)} tweets (public scrape) in {total_ms:.0f}ms over {len(rounds)} rounds")
+
+    # If X blocked everything, you’ll get ~0-2 tiny strings. Treat that as blocked.
+    # An incremental fetch that ran into cached tweets legitimately finds only a few.
+    if len(tweets) < 3 and not reached_known:
+        print("⚠️ Likely blocked by X login wall / rate limits.")
+        return []
+    return tweets[:limit]
+
+
+def get_tweets_cached(twitter_username: str, limit: int = 100, stats: Optional[Dict[str, Any]] = None):
+    """
+    get_tweets backed by the local tweet cache.
+
+    A handle fetched within TWEET_CACHE_TTL_SECONDS is served without opening
+    a browser. Otherwise only tweets newer than the cached ones are scraped,
+    then merged with the cache (newest first).
+    """
+    if tweet_cache.is_fresh(twitter_username):
+        cached = tweet_cache.get_recent(twitter_username, limit)
+        if cached:
+            print(f"✅ Using {len(cached)} cached tweets for @{twitter_username}")
+            if stats is not None:
+                stats["cacheHit"] = True
+            metrics.tweets_scraped.inc(len(cached), source="cache")
+            return cached
+
+    if stats is None:
+        stats = {}
+    stats["cacheHit"] = False
+    known = tweet_cache.known_hashes(twitter_username)
+    fresh = get_tweets(twitter_username, limit=limit, stats=stats, known_hashes=known)
+    if fresh or stats.get("reachedCached"):
+        tweet_cache.store(twitter_username, fresh)
+    elif known:
+        print("⚠️ Scrape returned nothing new, falling back to cached tweets")
+    metrics.tweets_scraped.inc(len(fresh), source="scrape")
+    return tweet_cache.get_recent(twitter_username, limit) if known else fresh
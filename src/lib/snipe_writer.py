@@ -0,0 +1,146 @@
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from . import metrics
+from .firestore_client import get_db
+
+SNIPE_WRITE_QUEUE_MAX = int(os.getenv("SNIPE_WRITE_QUEUE_MAX", "1000"))
+# Firestore caps a batch at 500 writes
+SNIPE_WRITE_BATCH_MAX = min(int(os.getenv("SNIPE_WRITE_BATCH_MAX", "500")), 500)
+# How long to keep collecting writes after the first one before committing
+SNIPE_WRITE_FLUSH_SECONDS = float(os.getenv("SNIPE_WRITE_FLUSH_SECONDS", "0.5"))
+SNIPE_WRITE_MAX_RETRIES = int(os.getenv("SNIPE_WRITE_MAX_RETRIES", "5"))
+SNIPE_WRITE_BACKOFF_SECONDS = float(os.getenv("SNIPE_WRITE_BACKOFF_SECONDS", "0.5"))
+
+_STOP = object()
+
+
+class WriteBehind:
+    """
+    Queues Firestore document writes and commits them from a background thread
+    in batch writes, retrying failed batches with jittered exponential backoff.
+
+    Writes to the same document within one batch are coalesced (last one wins).
+    When the queue is full, enqueue() blocks for a moment and then falls back
+    to writing inline, so callers get backpressure instead of lost results.
+    """
+
+    def __init__(self, db_factory: Callable[[], Any] = get_db, maxsize: int = SNIPE_WRITE_QUEUE_MAX):
+        self._db_factory = db_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0, "inline": 0}
+        self._thread = threading.Thread(target=self._run, name="snipe-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, collection: str, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None:
+        item = (collection, doc_id, data, merge)
+        try:
+            self._queue.put(item, timeout=1.0)
+        except queue.Full:
+            print("⚠️ Snipe write queue full, writing inline")
+            self._bump("inline")
+            self._commit_with_retry([item])
+            return
+        self._bump("enqueued")
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been committed (or given up on)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout=30)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+
+            items = [first]
+            stop = False
+            deadline = time.monotonic() + SNIPE_WRITE_FLUSH_SECONDS
+            while len(items) < SNIPE_WRITE_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                items.append(item)
+
+            try:
+                self._commit_with_retry(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                self._flush_remaining()
+                return
+
+    def _flush_remaining(self) -> None:
+        """Commit whatever is left in the queue on the calling thread (shutdown path)."""
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                items.append(item)
+            self._queue.task_done()
+        for i in range(0, len(items), SNIPE_WRITE_BATCH_MAX):
+            self._commit_with_retry(items[i:i + SNIPE_WRITE_BATCH_MAX])
+
+    def _commit_with_retry(self, items) -> None:
+        # coalesce repeated writes to the same document
+        latest: Dict[Tuple[str, str], Tuple[Dict[str, Any], bool]] = {}
+        for collection, doc_id, data, merge in items:
+            latest[(collection, doc_id)] = (data, merge)
+
+        for attempt in range(SNIPE_WRITE_MAX_RETRIES + 1):
+            try:
+                db = self._db_factory()
+                batch = db.batch()
+                for (collection, doc_id), (data, merge) in latest.items():
+                    batch.set(db.collection(collection).document(doc_id), data, merge=merge)
+                with metrics.timed("firestore_write"):
+                    batch.commit()
+                self._bump("batches")
+                self._bump("written", len(latest))
+                print(f"✅ Firestore batch write successful ({len(latest)} docs)")
+                return
+            except Exception as e:
+                if attempt == SNIPE_WRITE_MAX_RETRIES:
+                    self._bump("failed", len(latest))
+                    print(f"❌ Firestore batch write failed after {attempt + 1} attempts:", e)
+                    return
+                self._bump("retries")
+                delay = SNIPE_WRITE_BACKOFF_SECONDS * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
+
+snipe_writer = WriteBehind()
+atexit.register(snipe_writer.close)
@@ -11,6 +11,50 @@ export const supportChatClient = {
     return res.json();
   },
 
+  // Streams the reply over server-sent events. onDelta receives reply text as it
+  // arrives; resolves with the final `done` payload (reply, conversationId, ...).
+  async streamMessage(payload: any, onDelta: (text: string) => void) {
+    const res = await fetch(`${baseUrl}/api/support/chat/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+    if (!res.ok || !res.body) throw new Error("Support chat request failed");
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let done: any = null;
+
+    while (true) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE frames are separated by a blank line
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const frame = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of frame.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        if (!data) continue;
+
+        const parsed = JSON.parse(data);
+        if (event === "delta") onDelta(parsed.text);
+        else if (event === "done") done = parsed;
+      }
+    }
+
+    if (!done) throw new Error("Support chat stream ended early");
+    return done;
+  },
+
   async endChat(payload: any) {
     const res = await fetch(`${baseUrl}/api/support/chat/end`, {
       method: "POST",
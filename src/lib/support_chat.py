@@ -1,15 +1,20 @@
 import os
 import json
-from openai import OpenAI
+import time
 import re
 
-from .knowledge_loader import get_knowledge
-from .memory_store import get_or_create_convo, append_message
+from . import metrics
+from .knowledge_index import knowledge_index, retrieve
+from .memory_store import get_or_create_convo, append_message, increment_unknown_count
+from .context_builder import build_context
+from .llm_gateway import llm
+from .prompt_cache import PromptCache
+from .response_cache import support_cache, support_cache_key
 
 SUPPORT_EMAIL = "ammukuul15@gmail.com"
 
 def build_system_prompt():
-    kb = get_knowledge()
+    # static part only: per-message knowledge excerpts are added later by build_context
     return (
         "You are a friendly in-app support assistant for the Snipr web app.\n\n"
         "STYLE RULES (MUST FOLLOW):\n"
@@ -23,9 +28,17 @@ def build_system_prompt():
         "Return valid JSON ONLY in this exact shape:\n"
         '{ "reply":"...", "missing_feature":false, "feature_request": { "title":"", "description":"" } }\n\n'
         "KNOWLEDGE BASE (authoritative):\n"
-        f"{kb}"
+        "The knowledge base covers these pages and sections. Excerpts relevant to the user's "
+        "latest message are given in a separate system message just before it.\n"
+        f"{knowledge_index.outline()}"
     )
 
+# Assembled once per knowledge base version
+prompt_cache = PromptCache(build_system_prompt)
+
+def support_prompt_stats():
+    return prompt_cache.stats()
+
 def _strip_json_leaks(text: str) -> str:
     return re.sub(r"\{[\s\S]*\}\s*$", "", text).strip()
 
@@ -40,75 +53,255 @@ def _is_unknown_reply(parsed: dict) -> bool:
     ]
     return any(t in r for t in triggers)
 
-def support_chat(username, route, message, conversation_id):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {
-            "reply": "Server misconfiguration: OpenAI key is missing. Please contact the admin.",
+class ReplyStreamExtractor:
+    """
+    Pulls the "reply" string out of the model's JSON while it is still streaming.
+
+    feed() takes raw completion text and returns the newly decoded reply
+    characters (escapes resolved). If the output doesn't start as a JSON
+    object it is passed through as-is, matching support_chat's fallback.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self.raw = ""
+        self._pos = 0
+        self._mode = None  # None until decided, then "json" or "text"
+        self._in_reply = False
+        self._done = False
+
+    def feed(self, text: str) -> str:
+        self.raw += text
+        if self._mode is None:
+            stripped = self.raw.lstrip()
+            if not stripped:
+                return ""
+            self._mode = "json" if stripped.startswith("{") else "text"
+        if self._mode == "text":
+            out, self._pos = self.raw[self._pos:], len(self.raw)
+            return out
+        if self._done:
+            return ""
+
+        if not self._in_reply:
+            m = re.search(r'"reply"\s*:\s*"', self.raw)
+            if not m:
+                return ""
+            self._in_reply = True
+            self._pos = m.end()
+
+        out = []
+        raw = self.raw
+        while self._pos < len(raw):
+            ch = raw[self._pos]
+            if ch == '"':
+                self._done = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                self._pos += 1
+                continue
+            # escape sequence: wait for the rest of it if it was split across chunks
+            if self._pos + 1 >= len(raw):
+                break
+            esc = raw[self._pos + 1]
+            if esc == "u":
+                if self._pos + 6 > len(raw):
+                    break
+                try:
+                    out.append(chr(int(raw[self._pos + 2:self._pos + 6], 16)))
+                except ValueError:
+                    pass
+                self._pos += 6
+            else:
+                out.append(self._ESCAPES.get(esc, esc))
+                self._pos += 2
+        return "".join(out)
+
+
+def _error_result(reply):
+    return {
+        "reply": reply,
+        "missing_feature": False,
+        "feature_request": {"title": "", "description": ""},
+    }
+
+
+def _prepare(username, route, message, conversation_id):
+    """Record the user's message and build the chat messages for the completion."""
+    convo = get_or_create_convo(conversation_id, username)
+
+    # store user message + resets snapshot timer in memory_store
+    append_message(conversation_id, "user", message, route=route)
+
+    system_prompt, _ = prompt_cache.get()
+    with metrics.timed("support_retrieve"):
+        excerpts = "Relevant knowledge base excerpts:\n\n" + retrieve(message, route)
+
+    with metrics.timed("support_context"):
+        chat_messages, context_info = build_context(system_prompt, conversation_id, excerpts=excerpts)
+    return convo, chat_messages, context_info
+
+
+def _log_usage(usage, context_info, ttft_ms=None):
+    print(
+        f"🧮 support_chat prompt tokens={getattr(usage, 'prompt_tokens', None)}"
+        f" (estimated={context_info['promptTokens']},"
+        f" history={context_info['historyMessages']}/{context_info['totalMessages']},"
+        f" pendingFold={context_info['pendingFold']})"
+        + (f" ttft={ttft_ms}ms" if ttft_ms is not None else "")
+    )
+
+
+def _finish(convo, conversation_id, content):
+    """Parse the completion, apply unknown-count escalation and store the assistant reply."""
+    content = (content or "").strip()
+
+    # parse strict JSON
+    parsed = None
+    try:
+        parsed = json.loads(content)
+    except Exception:
+        parsed = {
+            "reply": content,
             "missing_feature": False,
             "feature_request": {"title": "", "description": ""},
         }
 
-    client = OpenAI(api_key=api_key)
+    # sanitize reply (never show JSON blob)
+    parsed["reply"] = _strip_json_leaks(parsed.get("reply", ""))
+
+    # increment unknownCount if needed
+    unknown_count = convo.unknown_count
+    if _is_unknown_reply(parsed):
+        unknown_count = increment_unknown_count(conversation_id)
+
+    # escalate after 2 unknowns
+    if unknown_count >= 2:
+        parsed["reply"] = (
+            parsed["reply"].rstrip()
+            + f"\n\nIf you still need help, email support at {SUPPORT_EMAIL} and let me know what the issue is ^_^."
+        )
+
+    # store assistant reply
+    append_message(conversation_id, "assistant", parsed.get("reply", ""))
+
+    return {
+        "reply": parsed.get("reply", ""),
+        "missing_feature": bool(parsed.get("missing_feature", False)),
+        "feature_request": parsed.get("feature_request", {"title": "", "description": ""}),
+    }
+
 
+def _cached_reply(username, route, message, conversation_id):
+    """
+    Serve an opening question from support_cache. Later turns depend on the
+    conversation so far and always go to the model.
+
+    Returns (result or None, key to store the fresh answer under or None).
+    """
     convo = get_or_create_convo(conversation_id, username)
+    if convo.message_count:
+        return None, None
+    key = support_cache_key(message, route)
+    if key is None:
+        return None, None
+    cached = support_cache.get(key)
+    if cached is None:
+        return None, key
+    cached = dict(cached)  # per-request fields (ttftMs) are set on the copy
 
-    # store user message + resets snapshot timer in memory_store
     append_message(conversation_id, "user", message, route=route)
+    append_message(conversation_id, "assistant", cached["reply"])
+    print(f"✅ support_chat cache hit for convo={conversation_id} ({key[0]!r} on {key[1]})")
+    return cached, key
+
 
-    system_prompt = build_system_prompt()
+def _remember(key, result):
+    # only plain answers: "doesn't exist" replies feed unknown-count escalation and feature emails
+    if key and result.get("reply") and not _is_unknown_reply(result):
+        support_cache.set(key, dict(result))
 
-    recent = list(convo["messages"])[-50:]
-    chat_messages = [{"role": "system", "content": system_prompt}]
-    chat_messages += [{"role": m["role"], "content": m["content"]} for m in recent]
+
+def support_chat(username, route, message, conversation_id):
+    if not os.getenv("OPENAI_API_KEY"):
+        return _error_result("Server misconfiguration: OpenAI key is missing. Please contact the admin.")
+
+    cached, cache_key = _cached_reply(username, route, message, conversation_id)
+    if cached:
+        return cached
+
+    convo, chat_messages, context_info = _prepare(username, route, message, conversation_id)
 
     try:
-        resp = client.chat.completions.create(
+        resp = llm.chat(
+            "support",
             model="gpt-4o-mini",
             messages=chat_messages,
             temperature=0.2,
         )
-
-        content = (resp.choices[0].message.content or "").strip()
-
-        # parse strict JSON
-        parsed = None
-        try:
-            parsed = json.loads(content)
-        except Exception:
-            parsed = {
-                "reply": content,
-                "missing_feature": False,
-                "feature_request": {"title": "", "description": ""},
-            }
-
-        # sanitize reply (never show JSON blob)
-        parsed["reply"] = _strip_json_leaks(parsed.get("reply", ""))
-
-        # increment unknownCount if needed
-        if _is_unknown_reply(parsed):
-            convo["unknownCount"] = (convo.get("unknownCount") or 0) + 1
-
-        # escalate after 2 unknowns
-        if (convo.get("unknownCount") or 0) >= 2:
-            parsed["reply"] = (
-                parsed["reply"].rstrip()
-                + f"\n\nIf you still need help, email support at {SUPPORT_EMAIL} and let me know what the issue is ^_^."
-            )
-
-        # store assistant reply
-        append_message(conversation_id, "assistant", parsed.get("reply", ""))
-
-        return {
-            "reply": parsed.get("reply", ""),
-            "missing_feature": bool(parsed.get("missing_feature", False)),
-            "feature_request": parsed.get("feature_request", {"title": "", "description": ""}),
-        }
+        _log_usage(getattr(resp, "usage", None), context_info)
+        result = _finish(convo, conversation_id, resp.choices[0].message.content)
+        _remember(cache_key, result)
+        return result
 
     except Exception as e:
         print("❌ OpenAI support_chat error:", repr(e))
-        return {
-            "reply": "I’m having trouble reaching the AI service right now. Please try again.",
-            "missing_feature": False,
-            "feature_request": {"title": "", "description": ""},
-        }
\ No newline at end of file
+        return _error_result("I’m having trouble reaching the AI service right now. Please try again.")
+
+
+def support_chat_stream(username, route, message, conversation_id):
+    """
+    Streaming variant of support_chat. Yields ("delta", text) as reply tokens
+    arrive, then one ("done", result) where result is support_chat's dict plus
+    ttftMs. The final reply can differ from the streamed text (escalation note,
+    JSON leak cleanup), so clients should replace it with result["reply"].
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        yield "done", _error_result("Server misconfiguration: OpenAI key is missing. Please contact the admin.")
+        return
+
+    started = time.perf_counter()
+
+    cached, cache_key = _cached_reply(username, route, message, conversation_id)
+    if cached:
+        cached["ttftMs"] = int((time.perf_counter() - started) * 1000)
+        metrics.support_ttft_seconds.observe(cached["ttftMs"] / 1000)
+        yield "delta", cached["reply"]
+        yield "done", cached
+        return
+
+    convo, chat_messages, context_info = _prepare(username, route, message, conversation_id)
+
+    extractor = ReplyStreamExtractor()
+    ttft_ms = None
+    usage = None
+    try:
+        stream = llm.stream_chat(
+            "support",
+            model="gpt-4o-mini",
+            messages=chat_messages,
+            temperature=0.2,
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = extractor.feed(chunk.choices[0].delta.content or "")
+            if delta:
+                if ttft_ms is None:
+                    ttft_ms = int((time.perf_counter() - started) * 1000)
+                    metrics.support_ttft_seconds.observe(ttft_ms / 1000)
+                yield "delta", delta
+    except Exception as e:
+        print("❌ OpenAI support_chat stream error:", repr(e))
+        yield "done", _error_result("I’m having trouble reaching the AI service right now. Please try again.")
+        return
+
+    _log_usage(usage, context_info, ttft_ms)
+    result = _finish(convo, conversation_id, extractor.raw)
+    _remember(cache_key, result)
+    result["ttftMs"] = ttft_ms
+    yield "done", result
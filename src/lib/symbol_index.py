@@ -0,0 +1,99 @@
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# Listing of valid symbols, one "SYMBOL|Name|ALIAS,ALIAS" per line
+SYMBOLS_PATH = os.getenv("SYMBOLS_PATH", os.path.join(os.path.dirname(__file__), "data", "symbols.txt"))
+
+# Shape of a Yahoo symbol: AAPL, BRK-B, BTC-USD
+_SYMBOL_RE = re.compile(r"^[A-Z]{1,5}(-[A-Z]{1,3})?$")
+
+
+def normalize_symbol(raw: str) -> str:
+    """'$brk.b ' -> 'BRK-B': drop the cashtag, upper-case, Yahoo-style share class separator."""
+    s = (raw or "").strip().lstrip("$").strip().upper()
+    return s.replace(".", "-").replace("/", "-").replace(" ", "")
+
+
+class SymbolIndex:
+    """
+    In-memory set of tradable symbols as a sorted array (binary search),
+    plus an alias table (FB -> META, BITCOIN -> BTC-USD, ...).
+
+    If the listing file is missing, every symbol that is merely well-formed
+    is accepted, so a deploy without the file degrades to shape checks only.
+    """
+
+    def __init__(self, path: str = SYMBOLS_PATH):
+        self.path = path
+        self._symbols: List[str] = []
+        self._names: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self.loaded = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"⚠️ Symbol listing not found at {self.path}; only checking symbol shape:", repr(e))
+            return
+
+        symbols = set()
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split("|")
+            symbol = normalize_symbol(parts[0])
+            if not _SYMBOL_RE.match(symbol):
+                continue
+            symbols.add(symbol)
+            if len(parts) > 1:
+                self._names[symbol] = parts[1].strip()
+            if len(parts) > 2:
+                for alias in parts[2].split(","):
+                    alias = normalize_symbol(alias)
+                    if alias:
+                        self._aliases[alias] = symbol
+
+        self._symbols = sorted(symbols)
+        self.loaded = True
+        print(f"✅ Symbol index loaded: {len(self._symbols)} symbols, {len(self._aliases)} aliases")
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def _contains(self, symbol: str) -> bool:
+        i = bisect_left(self._symbols, symbol)
+        return i < len(self._symbols) and self._symbols[i] == symbol
+
+    def resolve(self, raw: str) -> Optional[str]:
+        """Canonical symbol for a ticker/cashtag/alias, or None if it isn't a known symbol."""
+        symbol = normalize_symbol(raw)
+        if not symbol:
+            return None
+        if symbol in self._aliases:
+            return self._aliases[symbol]
+        if not _SYMBOL_RE.match(symbol):
+            return None
+        if not self.loaded:
+            return symbol
+        if self._contains(symbol):
+            return symbol
+        # "BRKB" style share class written without the separator
+        if len(symbol) > 1 and self._contains(f"{symbol[:-1]}-{symbol[-1]}"):
+            return f"{symbol[:-1]}-{symbol[-1]}"
+        return None
+
+    def name(self, symbol: str) -> Optional[str]:
+        return self._names.get(symbol)
+
+
+symbol_index = SymbolIndex()
+
+
+def resolve_symbol(raw: str) -> Optional[str]:
+    return symbol_index.resolve(raw)
@@ -0,0 +1,162 @@
+"""
+A local stand-in for x.com profile timelines, for benchmarks.
+
+    python -m src.lib.timeline_fake_server --port 8090
+    SNIPR_X_BASE_URL=http://127.0.0.1:8090 python -m src.lib.app
+
+GET /<handle> serves a static page with the handle's fixture tweets in the
+same markup the scraper reads (article > time[datetime] + div[lang]). Tweets
+render a page at a time: the first page on load, the next each time the
+window is scrolled to the bottom, so the scraper's scroll loop runs as it
+would against X.
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+# Cashtags used by the fixtures; benchmarks seed price histories for exactly these
+FIXTURE_TICKERS = ["AAPL", "TSLA", "NVDA", "AMD", "MSFT", "META", "AMZN", "GOOGL", "PLTR", "NFLX", "COIN", "SHOP"]
+
+_BULLISH = [
+    "${t} looking strong into earnings, loading calls",
+    "Added more ${t} today. This one is going much higher",
+    "${t} breakout confirmed, bullish",
+    "Long ${t} and ${t2}, both set up nicely",
+]
+_BEARISH = [
+    "Shorting ${t} here, overvalued",
+    "${t} puts printing, this is going to dump",
+    "Sell ${t} before the report, bearish",
+]
+_CHATTER = [
+    "Markets are wild this week",
+    "Reminder: position sizing matters more than entries",
+    "gm. coffee first, charts later",
+    "Anyone else watching the Fed today?",
+]
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{handle} / X</title>
+<style>article {{ min-height: 280px; border-bottom: 1px solid #ccc; }}</style>
+</head><body><main id="timeline"></main>
+<script>
+const tweets = {tweets};
+const pageSize = {page_size};
+const scrollDelayMs = {scroll_delay_ms};
+let shown = 0;
+let loading = false;
+function esc(s) {{ const d = document.createElement('div'); d.textContent = s; return d.innerHTML; }}
+function renderPage() {{
+  const main = document.getElementById('timeline');
+  for (const t of tweets.slice(shown, shown + pageSize)) {{
+    const a = document.createElement('article');
+    a.innerHTML = '<time datetime="' + t.postedAt + '"></time><div lang="en">' + esc(t.text) + '</div>';
+    main.appendChild(a);
+  }}
+  shown += pageSize;
+}}
+window.addEventListener('scroll', () => {{
+  if (loading || shown >= tweets.length) return;
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 50) return;
+  loading = true;
+  setTimeout(() => {{ renderPage(); loading = false; }}, scrollDelayMs);
+}});
+setTimeout(renderPage, scrollDelayMs);
+</script></body></html>
+"""
+
+
+def fixture_tweets(handle: str, count: int = 40) -> List[Dict[str, Any]]:
+    """Deterministic tweets for a handle, newest first, as the scraper returns them."""
+    rng = random.Random(handle.lower())
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    # spread over ~6 months so most calls have matured at every horizon
+    ages = sorted(rng.uniform(0.5, 180) for _ in range(count))
+    tweets = []
+    for i, age in enumerate(ages):
+        t, t2 = rng.sample(FIXTURE_TICKERS, 2)
+        roll = rng.random()
+        template = rng.choice(_CHATTER if roll < 0.3 else _BEARISH if roll < 0.5 else _BULLISH)
+        text = template.replace("{t}", t).replace("{t2}", t2)
+        posted = now - timedelta(days=age)
+        tweets.append({"text": f"{text} #{i} (@{handle})", "postedAt": posted.strftime("%Y-%m-%dT%H:%M:%S.000Z")})
+    return tweets
+
+
+class FakeTimelineHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server: "FakeTimelineServer" = self.server  # type: ignore[assignment]
+        handle = self.path.strip("/").split("?")[0].split("/")[0]
+        if not handle or handle == "favicon.ico":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        server.requests += 1
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        page = _PAGE.format(
+            handle=html.escape(handle),
+            tweets=json.dumps(fixture_tweets(handle, server.tweets_per_handle)).replace("</", "<\\/"),
+            page_size=server.page_size,
+            scroll_delay_ms=int(server.scroll_delay_ms),
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+
+class FakeTimelineServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, scroll_delay_ms: float = 150,
+                 tweets_per_handle: int = 40, page_size: int = 10):
+        super().__init__((host, port), FakeTimelineHandler)
+        self.latency_ms = latency_ms
+        self.scroll_delay_ms = scroll_delay_ms
+        self.tweets_per_handle = tweets_per_handle
+        self.page_size = page_size
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_fake_timeline(**kwargs) -> FakeTimelineServer:
+    """Start a fake timeline server on a background thread (port 0 picks a free port); see .base_url."""
+    server = FakeTimelineServer(**kwargs)
+    threading.Thread(target=server.serve_forever, name="timeline-fake-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake X profile timeline server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay before serving the page")
+    parser.add_argument("--scroll-delay-ms", type=float, default=150, help="delay before each page of tweets renders")
+    parser.add_argument("--tweets", type=int, default=40, help="tweets per handle")
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    server = FakeTimelineServer(args.host, args.port, args.latency_ms, args.scroll_delay_ms, args.tweets, args.page_size)
+    print(f"✅ Fake timeline server on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
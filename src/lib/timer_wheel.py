@@ -0,0 +1,84 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+Due = List[Tuple[Hashable, Any]]
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel driven by a single daemon thread.
+
+    Deadlines are rounded up to the next tick and hashed into one of `slots`
+    buckets, so schedule(), reschedule (schedule() on an existing key) and
+    cancel() are O(1). Every tick, all keys that came due are handed to
+    `handler` as one list of (key, payload) pairs, outside the wheel's lock.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Due], None],
+        tick_seconds: float = 0.5,
+        slots: int = 512,
+        name: str = "timer-wheel",
+    ):
+        self._handler = handler
+        self._tick = tick_seconds
+        self._buckets: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._entries: Dict[Hashable, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+        self._current = 0  # last tick already processed
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _tick_for(self, delay: float) -> int:
+        due = (time.monotonic() - self._origin + max(delay, 0.0)) / self._tick
+        return max(math.ceil(due), self._current + 1)
+
+    def schedule(self, key: Hashable, delay: float, payload: Any = None) -> None:
+        with self._lock:
+            self._remove_locked(key)
+            tick = self._tick_for(delay)
+            self._entries[key] = (tick, payload)
+            self._buckets[tick % len(self._buckets)][key] = tick
+
+    def cancel(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remove_locked(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._buckets[entry[0] % len(self._buckets)].pop(key, None)
+
+    def _advance(self) -> Due:
+        due: Due = []
+        now_tick = math.floor((time.monotonic() - self._origin) / self._tick)
+        with self._lock:
+            while self._current < now_tick:
+                self._current += 1
+                bucket = self._buckets[self._current % len(self._buckets)]
+                # keys further out than one revolution share the bucket; leave them
+                ready = [key for key, tick in bucket.items() if tick <= self._current]
+                for key in ready:
+                    del bucket[key]
+                    due.append((key, self._entries.pop(key)[1]))
+        return due
+
+    def _run(self) -> None:
+        while True:
+            next_at = self._origin + (self._current + 1) * self._tick
+            time.sleep(max(next_at - time.monotonic(), 0.0))
+            due = self._advance()
+            if not due:
+                continue
+            try:
+                self._handler(due)
+            except Exception as e:
+                print("❌ Timer wheel handler failed:", repr(e))
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from .local_db import LocalDB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id   TEXT PRIMARY KEY,
+    username          TEXT NOT NULL,
+    started_at        TEXT,
+    ended_at          TEXT,
+    last_saved_at     TEXT,
+    last_route        TEXT,
+    unknown_count     INTEGER NOT NULL DEFAULT 0,
+    feature_requested INTEGER NOT NULL DEFAULT 0,
+    message_count     INTEGER NOT NULL DEFAULT 0,
+    is_final          INTEGER NOT NULL DEFAULT 0,
+    path              TEXT
+);
+CREATE INDEX IF NOT EXISTS conversations_by_user ON conversations (username, started_at);
+CREATE INDEX IF NOT EXISTS conversations_by_start ON conversations (started_at);
+CREATE INDEX IF NOT EXISTS conversations_by_end ON conversations (ended_at);
+CREATE INDEX IF NOT EXISTS conversations_by_unknown ON conversations (unknown_count);
+CREATE INDEX IF NOT EXISTS conversations_by_feature ON conversations (feature_requested, started_at);
+
+CREATE TABLE IF NOT EXISTS conversation_routes (
+    conversation_id TEXT NOT NULL,
+    route           TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, route)
+);
+CREATE INDEX IF NOT EXISTS routes_by_route ON conversation_routes (route);
+"""
+
+_db = LocalDB(os.getenv("TRANSCRIPT_INDEX_PATH", "transcripts.sqlite3"), _SCHEMA)
+
+# Full-text search over message content; plain table + LIKE if this SQLite lacks FTS5
+try:
+    with _db.transaction() as _conn:
+        _conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+            "content, role UNINDEXED, ts UNINDEXED, conversation_id UNINDEXED)"
+        )
+    HAS_FTS = True
+except sqlite3.OperationalError:
+    with _db.transaction() as _conn:
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages_fts (content TEXT, role TEXT, ts TEXT, conversation_id TEXT)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS messages_by_convo ON messages_fts (conversation_id)")
+    HAS_FTS = False
+
+
+def _safe_username(u: str) -> str:
+    u = (u or "guest").strip()
+    return u if u.startswith("@") else f"@{u}"
+
+
+def record(convo: Dict[str, Any], new_messages: Iterable[Dict[str, Any]], path: Optional[str] = None, replace: bool = False) -> None:
+    """
+    Upsert a conversation's metadata and add `new_messages` to the full-text index.
+    With replace=True the conversation's indexed messages are dropped first (backfill).
+    """
+    convo_id = convo.get("conversationId") or "unknown"
+    routes = [r.get("route") for r in convo.get("routeHistory") or [] if r.get("route")]
+    new_messages = list(new_messages)
+
+    with _db.transaction() as conn:
+        if replace:
+            conn.execute("DELETE FROM messages_fts WHERE conversation_id = ?", (convo_id,))
+            indexed = 0
+        else:
+            row = conn.execute(
+                "SELECT message_count FROM conversations WHERE conversation_id = ?", (convo_id,)
+            ).fetchone()
+            indexed = row["message_count"] if row else 0
+
+        conn.execute(
+            """
+            INSERT INTO conversations (
+                conversation_id, username, started_at, ended_at, last_saved_at, last_route,
+                unknown_count, feature_requested, message_count, is_final, path
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(conversation_id) DO UPDATE SET
+                username = excluded.username,
+                started_at = excluded.started_at,
+                ended_at = excluded.ended_at,
+                last_saved_at = excluded.last_saved_at,
+                last_route = excluded.last_route,
+                unknown_count = excluded.unknown_count,
+                feature_requested = excluded.feature_requested,
+                message_count = excluded.message_count,
+                is_final = excluded.is_final,
+                path = COALESCE(excluded.path, conversations.path)
+            """,
+            (
+                convo_id,
+                _safe_username(convo.get("username")),
+                convo.get("startedAt"),
+                convo.get("endedAt"),
+                convo.get("lastSavedAt"),
+                routes[-1] if routes else None,
+                int(convo.get("unknownCount") or 0),
+                int(bool(convo.get("featureRequested"))),
+                indexed + len(new_messages),
+                int(bool(convo.get("isFinal"))),
+                path,
+            ),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO conversation_routes (conversation_id, route) VALUES (?, ?)",
+            [(convo_id, r) for r in set(routes)],
+        )
+        conn.executemany(
+            "INSERT INTO messages_fts (content, role, ts, conversation_id) VALUES (?, ?, ?, ?)",
+            [(m.get("content") or "", m.get("role"), m.get("ts"), convo_id) for m in new_messages],
+        )
+
+
+def _fts_query(text: str) -> str:
+    # quote every term so user input can't trip FTS5 query syntax
+    return " ".join('"' + t.replace('"', '""') + '"' for t in text.split())
+
+
+def search(
+    username: Optional[str] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    ended_after: Optional[str] = None,
+    ended_before: Optional[str] = None,
+    route: Optional[str] = None,
+    min_unknown: Optional[int] = None,
+    feature_requested: Optional[bool] = None,
+    text: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Conversations matching every given filter, newest first. Timestamps are ISO strings."""
+    where, params = [], []
+    if username:
+        where.append("c.username = ?")
+        params.append(_safe_username(username))
+    if started_after:
+        where.append("c.started_at >= ?")
+        params.append(started_after)
+    if started_before:
+        where.append("c.started_at <= ?")
+        params.append(started_before)
+    if ended_after:
+        where.append("c.ended_at >= ?")
+        params.append(ended_after)
+    if ended_before:
+        where.append("c.ended_at <= ?")
+        params.append(ended_before)
+    if route:
+        where.append("c.conversation_id IN (SELECT conversation_id FROM conversation_routes WHERE route = ?)")
+        params.append(route)
+    if min_unknown is not None:
+        where.append("c.unknown_count >= ?")
+        params.append(int(min_unknown))
+    if feature_requested is not None:
+        where.append("c.feature_requested = ?")
+        params.append(int(bool(feature_requested)))
+    if text and text.strip():
+        if HAS_FTS:
+            where.append("c.conversation_id IN (SELECT conversation_id FROM messages_fts WHERE messages_fts MATCH ?)")
+            params.append(_fts_query(text))
+        else:
+            where.append("c.conversation_id IN (SELECT conversation_id FROM messages_fts WHERE content LIKE ?)")
+            params.append(f"%{text.strip()}%")
+
+    sql = "SELECT c.* FROM conversations c"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.started_at DESC LIMIT ? OFFSET ?"
+    params += [int(limit), int(offset)]
+    return [dict(r) for r in _db.query(sql, params)]
+
+
+def backfill(root: str) -> int:
+    """Index every conversation under a chat_logs tree. Returns the number indexed."""
+    from .transcripts import load_conversation
+
+    count = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.endswith((".json", ".jsonl")):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                loaded = load_conversation(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Skipping unreadable transcript {path}:", repr(e))
+                continue
+            # older exports hold a list of conversations in one file
+            for convo in loaded if isinstance(loaded, list) else [loaded]:
+                if not isinstance(convo, dict) or not convo.get("conversationId"):
+                    continue
+                record(convo, convo.get("messages") or [], path=path, replace=True)
+                count += 1
+    return count
+
+
+def main(argv=None):
+    from .transcripts import CHAT_LOG_DIR
+
+    parser = argparse.ArgumentParser(description="Snipr support transcript index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_backfill = sub.add_parser("backfill", help="index an existing chat_logs tree")
+    p_backfill.add_argument("--dir", default=CHAT_LOG_DIR)
+
+    p_search = sub.add_parser("search", help="query indexed conversations")
+    p_search.add_argument("--username")
+    p_search.add_argument("--started-after")
+    p_search.add_argument("--started-before")
+    p_search.add_argument("--ended-after")
+    p_search.add_argument("--ended-before")
+    p_search.add_argument("--route")
+    p_search.add_argument("--min-unknown", type=int)
+    p_search.add_argument("--feature-requested", action="store_true", default=None)
+    p_search.add_argument("--text")
+    p_search.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+    if args.command == "backfill":
+        print(f"✅ Indexed {backfill(args.dir)} conversations from {args.dir}")
+    else:
+        rows = search(
+            username=args.username,
+            started_after=args.started_after,
+            started_before=args.started_before,
+            ended_after=args.ended_after,
+            ended_before=args.ended_before,
+            route=args.route,
+            min_unknown=args.min_unknown,
+            feature_requested=args.feature_requested,
+            text=args.text,
+            limit=args.limit,
+        )
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
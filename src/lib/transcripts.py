@@ -1,14 +1,23 @@
+import atexit
 import os
 import json
+import threading
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import transcript_index
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-CHAT_LOG_DIR = os.path.join(BASE_DIR, "chat_logs")
+CHAT_LOG_DIR = os.getenv("SNIPR_CHAT_LOG_DIR", os.path.join(BASE_DIR, "chat_logs"))
+
+_known_dirs = set()
 
 
 def _ensure_dir(path: str) -> None:
+    if path in _known_dirs:
+        return
     os.makedirs(path, exist_ok=True)
+    _known_dirs.add(path)
 
 
 def _safe_username(u: str) -> str:
@@ -16,43 +25,271 @@ def _safe_username(u: str) -> str:
     return u if u.startswith("@") else f"@{u}"
 
 
-def upsert_conversation_file(convo: Dict[str, Any], is_final: bool = False) -> str:
+def _paths(username: str, convo_id: str) -> Tuple[str, str, str]:
+    user_dir = os.path.join(CHAT_LOG_DIR, username)
+    return user_dir, os.path.join(user_dir, f"{convo_id}.jsonl"), os.path.join(user_dir, f"{convo_id}.json")
+
+
+def _meta(convo: Dict[str, Any], username: str, convo_id: str, is_final: bool) -> Dict[str, Any]:
+    meta = {k: v for k, v in convo.items() if k != "messages"}
+    meta["username"] = username
+    meta["conversationId"] = convo_id
+
+    now = datetime.utcnow().isoformat()
+    meta.setdefault("startedAt", now)
+    meta["lastSavedAt"] = now
+    meta["isFinal"] = bool(is_final)
+
+    if is_final and not meta.get("endedAt"):
+        meta["endedAt"] = now
+    return meta
+
+
+def read_journal(path: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Replay a .jsonl journal into (latest meta, all messages). A torn last line is skipped."""
+    meta, messages = None, []
+    if not os.path.exists(path):
+        return meta, messages
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.pop("type", None)
+            if kind == "meta":
+                meta = record
+            elif kind == "message":
+                messages.append(record)
+    return meta, messages
+
+
+def load_conversation(path: str) -> Optional[Dict[str, Any]]:
+    """Read a conversation from either a compacted .json file or a live .jsonl journal."""
+    if path.endswith(".jsonl"):
+        meta, messages = read_journal(path)
+        if meta is None:
+            return None
+        convo = dict(meta)
+        convo["messages"] = messages
+        return convo
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _atomic_write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TranscriptWriter:
     """
-    Writes/overwrites ONE file per conversation:
-      chat_logs/<username>/<conversationId>.json
+    Persists conversations from a background thread.
 
-    - snapshots overwrite the same file
-    - final save marks endedAt and overwrites the same file
+    Snapshots append only the messages that are new since the last write to
+    chat_logs/<username>/<conversationId>.jsonl (plus a small meta record).
+    The final save replays the journal into the usual indented
+    <conversationId>.json via temp file + rename, then removes the journal.
+    Repeated snapshots of one conversation queued before the thread gets to
+    them are coalesced into a single write.
     """
-    username = _safe_username(convo.get("username") or "guest")
-    convo_id = convo.get("conversationId") or "unknown"
 
-    user_dir = os.path.join(CHAT_LOG_DIR, username)
-    _ensure_dir(user_dir)
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Tuple[Dict[str, Any], bool, bool]] = {}
+        self._busy = False
+        # conversationId -> what the journal holds (see _journal_state); reloadable from the journal
+        self._written: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"snapshots": 0, "finals": 0, "coalesced": 0, "messagesAppended": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
 
-    path = os.path.join(user_dir, f"{convo_id}.json")
+    def submit(self, convo: Dict[str, Any], is_final: bool, forget: bool = False) -> None:
+        """Queue a write. forget=True drops the in-memory journal state once it's written (evictions)."""
+        convo_id = convo.get("conversationId") or "unknown"
+        with self._cond:
+            previous = self._pending.get(convo_id)
+            if previous:
+                self._stats["coalesced"] += 1
+                is_final = is_final or previous[1]
+                forget = forget or previous[2]
+            self._pending[convo_id] = (convo, is_final, forget)
+            self._cond.notify()
 
-    safe_convo = dict(convo)
-    safe_convo["messages"] = list(convo.get("messages", [])) 
-    safe_convo["username"] = username
-    safe_convo["conversationId"] = convo_id
+    def forget(self, convo_id: str) -> None:
+        """Drop the journal state for a conversation that left memory without needing a write."""
+        with self._cond:
+            previous = self._pending.get(convo_id)
+            if previous:
+                self._pending[convo_id] = (previous[0], previous[1], True)
+            else:
+                self._written.pop(convo_id, None)
 
-    now = datetime.utcnow().isoformat()
-    safe_convo.setdefault("startedAt", now)
-    safe_convo["lastSavedAt"] = now
-    safe_convo["isFinal"] = bool(is_final)
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything submitted so far is on disk."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout=timeout)
 
-    if is_final and not safe_convo.get("endedAt"):
-        safe_convo["endedAt"] = now
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(safe_convo, f, ensure_ascii=False, indent=2)
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+            for convo_id, (convo, is_final, forget) in batch.items():
+                try:
+                    if is_final:
+                        self._write_final(convo)
+                    else:
+                        self._write_snapshot(convo)
+                except Exception as e:
+                    with self._cond:
+                        self._stats["errors"] += 1
+                    print(f"❌ Transcript write failed for convo={convo.get('conversationId')}:", repr(e))
+                if forget:
+                    with self._cond:
+                        if convo_id not in self._pending:
+                            self._written.pop(convo_id, None)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
 
-    return path
+    def _journal_state(self, convo_id: str, journal: str, session: str) -> Dict[str, Any]:
+        """
+        How much of this conversation the journal already holds.
+
+        A conversation that comes back under the same id (after an eviction or
+        a restart) is a new in-memory session that counts its messages from 0
+        again; it is told apart by its startedAt, and its messages are appended
+        after everything earlier sessions wrote ("base").
+        """
+        state = self._written.get(convo_id)
+        if state is None:
+            # first write since startup or since it was evicted: trust what the journal says it holds
+            meta, _ = read_journal(journal)
+            meta = meta or {}
+            written = int(meta.get("messageCount") or 0)
+            state = {
+                "startedAt": meta.get("startedAt") or session,
+                "session": meta.get("sessionStartedAt") or meta.get("startedAt"),
+                "base": int(meta.get("sessionBase") or 0),
+                "written": written,
+            }
+        if state["session"] != session:
+            state = {**state, "session": session, "base": state["written"]}
+        self._written[convo_id] = state
+        return state
+
+    def _append(self, convo: Dict[str, Any], username: str, convo_id: str, journal: str, is_final: bool) -> None:
+        messages = list(convo.get("messages", []))
+        state = self._journal_state(convo_id, journal, convo.get("startedAt") or "")
+        total = state["base"] + int(convo.get("messageCount") or len(messages))
+        new = total - state["written"]
+        fresh = messages[-new:] if new > 0 else []
+
+        records = [json.dumps({"type": "message", **m}, ensure_ascii=False) for m in fresh]
+        meta = _meta(convo, username, convo_id, is_final)
+        meta["messageCount"] = total
+        meta["startedAt"] = state["startedAt"]
+        meta["sessionStartedAt"] = state["session"]
+        meta["sessionBase"] = state["base"]
+        records.append(json.dumps({"type": "meta", **meta}, ensure_ascii=False))
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write("\n".join(records) + "\n")
+
+        state["written"] = max(total, state["written"])
+        with self._cond:
+            self._stats["messagesAppended"] += len(fresh)
+        self._index(meta, fresh, journal)
+
+    def _index(self, convo: Dict[str, Any], new_messages: List[Dict[str, Any]], path: str) -> None:
+        try:
+            transcript_index.record(convo, new_messages, path=path)
+        except Exception as e:
+            print(f"⚠️ Transcript index update failed for convo={convo.get('conversationId')}:", repr(e))
+
+    def _write_snapshot(self, convo: Dict[str, Any]) -> None:
+        username = _safe_username(convo.get("username") or "guest")
+        convo_id = convo.get("conversationId") or "unknown"
+        user_dir, journal, _ = _paths(username, convo_id)
+        _ensure_dir(user_dir)
+
+        self._append(convo, username, convo_id, journal, is_final=False)
+        with self._cond:
+            self._stats["snapshots"] += 1
+
+    def _write_final(self, convo: Dict[str, Any]) -> None:
+        username = _safe_username(convo.get("username") or "guest")
+        convo_id = convo.get("conversationId") or "unknown"
+        user_dir, journal, final = _paths(username, convo_id)
+        _ensure_dir(user_dir)
+
+        if os.path.exists(journal):
+            # compaction: bring the journal up to date, then rewrite it as one JSON document
+            self._append(convo, username, convo_id, journal, is_final=True)
+            meta, messages = read_journal(journal)
+            safe_convo = {k: v for k, v in (meta or {}).items() if k not in ("sessionStartedAt", "sessionBase")}
+            safe_convo["messages"] = messages
+        else:
+            safe_convo = _meta(convo, username, convo_id, is_final=True)
+            safe_convo["messages"] = list(convo.get("messages", []))
+
+        indexed_already = os.path.exists(journal)
+        _atomic_write_json(final, safe_convo)
+        if indexed_already:
+            os.remove(journal)
+        self._written.pop(convo_id, None)
+        self._index(safe_convo, [] if indexed_already else safe_convo["messages"], final)
+        with self._cond:
+            self._stats["finals"] += 1
+
+
+_writer = TranscriptWriter()
+atexit.register(_writer.flush)
+
+
+def upsert_conversation_file(convo: Dict[str, Any], is_final: bool = False, evicted: bool = False) -> str:
+    """
+    Queues a write of ONE conversation under chat_logs/<username>/:
+      - snapshots append new messages to <conversationId>.jsonl
+      - final save compacts everything into <conversationId>.json (marks endedAt)
+    evicted=True marks the last write before the conversation leaves memory.
+
+    Returns the path the conversation will be written to.
+    """
+    username = _safe_username(convo.get("username") or "guest")
+    convo_id = convo.get("conversationId") or "unknown"
+    _, journal, final = _paths(username, convo_id)
+
+    _writer.submit(convo, is_final, forget=evicted)
+    return final if is_final else journal
+
+
+def forget_conversation(conversation_id: str) -> None:
+    """The conversation left memory with nothing new to write; drop the writer's state for it."""
+    _writer.forget(conversation_id)
 
 
 def save_transcript(convo: Dict[str, Any]) -> str:
     """Final save (Clear button / end endpoint)."""
     path = upsert_conversation_file(convo, is_final=True)
-    print(f"✅ Final transcript saved: {path}")
+    print(f"✅ Final transcript queued: {path}")
     return path
+
+
+def flush_transcripts(timeout: float = 10.0) -> bool:
+    return _writer.flush(timeout)
+
+
+def transcript_writer_stats() -> Dict[str, int]:
+    return _writer.stats()
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Set
+
+from .local_db import LocalDB
+
+# A handle scraped less than this long ago is served straight from the cache
+TWEET_CACHE_TTL_SECONDS = int(os.getenv("TWEET_CACHE_TTL_SECONDS", "3600"))
+# Oldest tweets beyond this many per handle are dropped on write
+TWEET_CACHE_MAX_PER_USER = int(os.getenv("TWEET_CACHE_MAX_PER_USER", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    username   TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    text       TEXT NOT NULL,
+    posted_at  TEXT,
+    fetched_at REAL NOT NULL,
+    rank       INTEGER NOT NULL,
+    PRIMARY KEY (username, hash)
+);
+CREATE INDEX IF NOT EXISTS tweets_by_recency ON tweets (username, fetched_at DESC, rank ASC);
+
+CREATE TABLE IF NOT EXISTS fetches (
+    username        TEXT PRIMARY KEY,
+    last_fetched_at REAL NOT NULL
+);
+"""
+
+_db = LocalDB(os.getenv("TWEET_CACHE_PATH", "tweets.sqlite3"), _SCHEMA)
+
+# caches created before tweets carried timestamps
+if "posted_at" not in {r["name"] for r in _db.query("PRAGMA table_info(tweets)")}:
+    with _db.transaction() as _conn:
+        _conn.execute("ALTER TABLE tweets ADD COLUMN posted_at TEXT")
+
+
+def _key(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+def tweet_hash(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def is_fresh(username: str) -> bool:
+    rows = _db.query("SELECT last_fetched_at FROM fetches WHERE username = ?", (_key(username),))
+    return bool(rows) and time.time() - rows[0]["last_fetched_at"] < TWEET_CACHE_TTL_SECONDS
+
+
+def known_hashes(username: str) -> Set[str]:
+    rows = _db.query("SELECT hash FROM tweets WHERE username = ?", (_key(username),))
+    return {r["hash"] for r in rows}
+
+
+def get_recent(username: str, limit: int) -> List[Dict[str, Any]]:
+    """Cached tweets for a handle as {"text", "postedAt"} dicts, newest first."""
+    rows = _db.query(
+        "SELECT text, posted_at FROM tweets WHERE username = ? ORDER BY fetched_at DESC, rank ASC LIMIT ?",
+        (_key(username), limit),
+    )
+    return [{"text": r["text"], "postedAt": r["posted_at"]} for r in rows]
+
+
+def store(username: str, tweets: List[Dict[str, Any]]) -> None:
+    """
+    Record a scrape. `tweets` is in timeline order (newest first); tweets
+    already stored keep their original position.
+    """
+    key = _key(username)
+    now = time.time()
+    with _db.transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tweets (username, hash, text, posted_at, fetched_at, rank) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(key, tweet_hash(t["text"]), t["text"], t.get("postedAt"), now, i) for i, t in enumerate(tweets)],
+        )
+        conn.execute(
+            "INSERT INTO fetches (username, last_fetched_at) VALUES (?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET last_fetched_at = excluded.last_fetched_at",
+            (key, now),
+        )
+        conn.execute(
+            "DELETE FROM tweets WHERE username = ? AND hash NOT IN ("
+            "SELECT hash FROM tweets WHERE username = ? ORDER BY fetched_at DESC, rank ASC LIMIT ?)",
+            (key, key, TWEET_CACHE_MAX_PER_USER),
+        )
@@ -21,6 +21,8 @@ import { collection, getDocs } from "firebase/firestore";
 import { getAuth } from "firebase/auth";
 import { toast } from "sonner";
 
+const ANALYZE_POLL_MS = 2000;
+
 type Creator = {
   username: string;
   tickers: string;
@@ -59,32 +61,8 @@ export default function Dashboard() {
     setCreators(data);
   };
 
-  const fetchPersonalResult = async (targetUsername: string) => {
-    const appUsername = localStorage.getItem("username")?.replace(/^@/, "");
-    if (!appUsername) return;
-
-    const snapshot = await getDocs(collection(db, `${appUsername}snipe`));
-    const docs = snapshot.docs.map((doc) => doc.data());
-
-    const match = docs.find(
-      (doc) => doc.username?.toLowerCase() === targetUsername.toLowerCase()
-    );
-
-    if (match) {
-      setPersonalResult({
-        username: match.username,
-        tickers: match.tickers,
-        score: match.reliabilityScore,
-        breakdown: match.breakdown,
-      });
-    } else {
-      console.warn("⚠️ No match found for", targetUsername);
-    }
-  };
-
   const handleGoClick = async () => {
     const username = extractUsername(searchUrl);
-    const cleanTwitterUsername = username.replace(/^@/, "");
     if (!username) {
       toast.error("Invalid Twitter URL");
       return;
@@ -112,8 +90,24 @@ export default function Dashboard() {
         body: JSON.stringify({ twitterUrl: searchUrl }),
       });
 
-      const result = await res.json();
-      if (!result.success) throw new Error("Analysis failed");
+      const queued = await res.json();
+      if (!queued.success || !queued.jobId) throw new Error("Analysis failed");
+
+      // analysis runs as a background job; poll until it finishes
+      let job = queued;
+      while (job.status !== "done" && job.status !== "failed") {
+        await new Promise((resolve) => setTimeout(resolve, ANALYZE_POLL_MS));
+        const statusRes = await fetch(`${baseUrl}/analyze/jobs/${queued.jobId}`, {
+          headers: { Authorization: `Bearer ${idToken}` },
+        });
+        job = await statusRes.json();
+        if (!job.success) throw new Error("Analysis failed");
+      }
+
+      const result = job.result;
+      if (job.status === "failed" || !result?.success) {
+        throw new Error(job.error || "Analysis failed");
+      }
 
       if (result.message === "No ticker calls found.") {
         setPersonalResult({
@@ -124,7 +118,14 @@ export default function Dashboard() {
         });
         toast("No valid ticker calls were found.");
       } else {
-        await fetchPersonalResult(cleanTwitterUsername); // 👈 pass actual username here
+        // render from the job result: the snipe document is written in the background
+        // and may not be in Firestore yet when the job reports "done"
+        setPersonalResult({
+          username: result.username,
+          tickers: result.tickers,
+          score: result.reliability,
+          breakdown: result.breakdown,
+        });
         await fetchTrendingData();
       }
     } catch (err) {